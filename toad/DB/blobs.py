@@ -0,0 +1,402 @@
+"""
+TOAD.db.blobs
+
+I am a content addressed sequence store, shared by every project store (sqlite.Pi, ShardedPi) that is opened with me.
+A sequence is kept once, keyed by its DnaHash, however many projects carry it; the projects keep only signatures.
+
+* sequences are appended, 2-bit packed (see twobit_encode), to segment files (seg-000000.pack, ...) that are never rewritten,
+* index.bin is an on-disk, open addressing (linear probing) hash table of signature -> (segment, offset, size),
+  memory mapped by every reader and writer,
+* writers (in any number of processes) take turns under a lock file, one batch at a time, and skip every sequence
+  that is already present; the index header records how much of the current segment is committed,
+  so a torn append is simply overwritten by the next batch,
+* a batch commits in one step: its records are synced, then the header's tail moves past them, and only then are
+  index slots written, so a slot never points past the committed tail (a crash before the slots leaves the records
+  unindexed, and the next batch that carries them appends them again).
+
+Each record in a segment repeats its key (digest, mode) ahead of the packed bytes, so the index can always be rebuilt
+from the segments alone (see reindex).
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from toad.lib import common as cx
+
+try:
+    import fcntl
+except ImportError:  # -- no fcntl (Windows): a single writer process is assumed
+    fcntl = None
+
+
+LAYOUT = 'layout.json'
+LAYOUT_FORMAT = 'toad.blobs'
+INDEX = 'index.bin'
+LOCK = 'lock'
+INDEX_VERSION = 1
+INDEX_SLOTS = 1 << 16  # -- slots of a new index (always a power of 2)
+MAX_LOAD = 0.5  # -- the index doubles before more than this fraction of its slots are taken
+SEGMENT_LIMIT = 1 << 30  # -- bytes of a segment file before the next one is started
+
+# -- slot flags
+TAKEN = 1
+CANONICAL = 2
+
+_HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('pad', '<u4'), ('capacity', '<u8'), ('count', '<u8'),
+                    ('segment', '<u8'), ('tail', '<u8'), ('reserved', '<u8', 2)])  # -- 64 bytes
+_SLOT = np.dtype([('hi', '<u8'), ('lo', '<u8'), ('where', '<u8'), ('size', '<u4'), ('flags', '<u4')])  # -- 32 bytes
+_MAGIC = b'TOADBLIX'
+_RECORD = struct.Struct('<16sBI')  # -- digest, slot flags, size of the packed sequence that follows
+_OFFSET_BITS = 40  # -- where = segment << 40 | offset
+
+
+def _keys(sigs):
+    """
+    I answer (texts, hi, lo, flags) for sigs (Nucleotides, DnaHash, SequenceAndSignature or their text): ...
+    each one's DnaHash text, the two uint64 halves of its digest, and its slot flags.
+    """
+    texts = []
+    for sig in sigs:
+        if isinstance(sig, (cx.Nucleotides, cx.SequenceAndSignature)):
+            sig = sig.signature
+        texts.append(str(sig))
+    if not texts:
+        empty = np.empty(0, dtype=np.uint64)
+        return (texts, empty, empty, np.empty(0, dtype=np.uint32))
+    mark = cx.DnaHash.CANONICAL_MARK
+    hi, lo = cx._digest_columns(cx._b85decode([text.lstrip(mark) for text in texts]))
+    flags = np.array([TAKEN | (CANONICAL if text.startswith(mark) else 0) for text in texts], dtype=np.uint32)
+    return (texts, hi, lo, flags)
+
+
+def _probe(table, hi, lo, flags):
+    """
+    I answer the slot of each key in table, or -1 for the keys it does not hold.
+    All keys step through their probe sequences together, one vectorized step at a time.
+    """
+    mask = np.uint64(len(table) - 1)
+    slots = (hi & mask).astype(np.int64)
+    found = np.full(len(hi), -1, dtype=np.int64)
+    todo = np.arange(len(hi))
+    while len(todo):
+        entries = table[slots[todo]]
+        hit = (entries['flags'] == flags[todo]) & (entries['hi'] == hi[todo]) & (entries['lo'] == lo[todo])
+        found[todo[hit]] = slots[todo[hit]]
+        todo = todo[~(hit | (entries['flags'] == 0))]
+        slots[todo] = (slots[todo] + 1) & int(mask)
+    return found
+
+
+def _place(table, entries):
+    """
+    I add entries (an array of _SLOT, none of them already in table) to table, with linear probing.
+    Where several entries want the same free slot, the first takes it and the others move on.
+    """
+    mask = len(table) - 1
+    slots = (entries['hi'] & np.uint64(mask)).astype(np.int64)
+    todo = np.arange(len(entries))
+    while len(todo):
+        free = (table['flags'][slots[todo]] == 0)
+        claims = todo[free]
+        _, first = np.unique(slots[claims], return_index=True)
+        winners = claims[first]
+        table[slots[winners]] = entries[winners]
+        placed = np.zeros(len(entries), dtype=bool)
+        placed[winners] = True
+        todo = todo[~placed[todo]]
+        slots[todo] = (slots[todo] + 1) & mask
+
+
+class BlobStore:
+    """
+    I am the content addressed sequence store kept in the directory root (created on first use, unless readonly).
+    """
+    def __init__(self, root, readonly=False):
+        self.root = root
+        self.readonly = readonly
+        self.index_path = os.path.join(root, INDEX)
+        layout = os.path.join(root, LAYOUT)
+        if not os.path.exists(layout):
+            if readonly:
+                raise ValueError("there is no toad blob store at {}".format(root))
+            os.makedirs(root, exist_ok=True)
+            with open(layout + '.tmp', 'wt') as ostream:
+                json.dump({'format': LAYOUT_FORMAT, 'index': INDEX, 'segment_limit': SEGMENT_LIMIT,
+                           'encoding': 'P (2 bits per base)'}, ostream, indent=3)
+            os.replace(layout + '.tmp', layout)
+        with open(layout, 'rt') as istream:
+            self.layout = json.load(istream)
+        if self.layout.get('format') != LAYOUT_FORMAT:
+            raise ValueError("{} is not the layout of a toad blob store".format(layout))
+
+        self._lock = threading.Lock()
+        self._maps = {}  # -- segment number -> read only mmap
+        self._index_id = None
+        if not os.path.exists(self.index_path):
+            if readonly:
+                raise ValueError("the toad blob store at {} has no index".format(root))
+            with self._writing():
+                if not os.path.exists(self.index_path):
+                    self.reindex()
+        self._refresh()
+
+    def close(self):
+        with self._lock:
+            for m in self._maps.values():
+                m.close()
+            self._maps = {}
+            self._header = self._table = None
+            self._index_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        self._refresh()
+        return int(self._header['count'][0])
+
+    def segment_path(self, i):
+        return os.path.join(self.root, 'seg-{:06d}.pack'.format(i))
+
+    # ----------------------------------------------
+    # -- The index file                            |
+    # ----------------------------------------------
+    def _refresh(self):
+        """
+        I (re)map the index file, if it was replaced (grown or rebuilt) since I last mapped it.
+        """
+        st = os.stat(self.index_path)
+        if (st.st_ino, st.st_size) == self._index_id:
+            return
+        with self._lock:
+            mode = 'r' if self.readonly else 'r+'
+            header = np.memmap(self.index_path, dtype=_HEADER, mode=mode, shape=(1,))
+            if (header['magic'][0] != _MAGIC) or (header['version'][0] != INDEX_VERSION):
+                raise ValueError("{} is not a version {} toad blob index".format(self.index_path, INDEX_VERSION))
+            self._header = header
+            self._table = np.memmap(self.index_path, dtype=_SLOT, mode=mode, offset=_HEADER.itemsize,
+                                    shape=(int(header['capacity'][0]),))
+            self._index_id = (st.st_ino, st.st_size)
+
+    def _write_index(self, table, count, segment, tail):
+        """
+        I replace the index file (atomically) with one holding table.
+        """
+        header = np.zeros(1, dtype=_HEADER)
+        header['magic'], header['version'], header['capacity'] = _MAGIC, INDEX_VERSION, len(table)
+        header['count'], header['segment'], header['tail'] = count, segment, tail
+        with open(self.index_path + '.tmp', 'wb') as ostream:
+            ostream.write(header.tobytes())
+            ostream.write(table.tobytes())
+            ostream.flush()
+            os.fsync(ostream.fileno())
+        os.replace(self.index_path + '.tmp', self.index_path)
+        self._index_id = None
+        self._refresh()
+
+    def _grown(self, needed):
+        """
+        I make sure the index has room for needed more entries, doubling it (into a new file) if it does not.
+        """
+        count = int(self._header['count'][0])
+        capacity = len(self._table)
+        if count + needed <= capacity * MAX_LOAD:
+            return
+        while count + needed > capacity * MAX_LOAD:
+            capacity *= 2
+        table = np.zeros(capacity, dtype=_SLOT)
+        _place(table, np.array(self._table[self._table['flags'] != 0]))
+        self._write_index(table, count, int(self._header['segment'][0]), int(self._header['tail'][0]))
+
+    def reindex(self):
+        """
+        I rebuild the index from the records in my segments (e.g. after index.bin was lost).
+        """
+        table = np.zeros(INDEX_SLOTS, dtype=_SLOT)
+        count, segment, tail = 0, 0, 0
+        while os.path.exists(self.segment_path(segment)):
+            entries, tail = [], 0
+            with open(self.segment_path(segment), 'rb') as istream:
+                data = istream.read()
+            while tail + _RECORD.size <= len(data):
+                digest, flags, size = _RECORD.unpack_from(data, tail)
+                if tail + _RECORD.size + size > len(data):
+                    break  # -- a torn append
+                entries.append((digest, flags, (segment << _OFFSET_BITS) | (tail + _RECORD.size), size))
+                tail += _RECORD.size + size
+            if entries:
+                slots = np.zeros(len(entries), dtype=_SLOT)
+                hi, lo = cx._digest_columns(np.frombuffer(b''.join([e[0] for e in entries]), dtype=np.uint8).reshape(-1, cx.SIGSIZE))
+                slots['hi'], slots['lo'] = hi, lo
+                slots['flags'] = [e[1] for e in entries]
+                slots['where'] = [e[2] for e in entries]
+                slots['size'] = [e[3] for e in entries]
+                # -- a key appended twice (by a torn batch that was later repeated) is only indexed once
+                known = _probe(table, slots['hi'], slots['lo'], slots['flags'])
+                slots = slots[known < 0]
+                _, first = np.unique(np.stack([slots['hi'], slots['lo'], slots['flags'].astype(np.uint64)]), axis=1, return_index=True)
+                slots = slots[np.sort(first)]
+                while count + len(slots) > len(table) * MAX_LOAD:
+                    grown = np.zeros(len(table) * 2, dtype=_SLOT)
+                    _place(grown, table[table['flags'] != 0])
+                    table = grown
+                _place(table, slots)
+                count += len(slots)
+            if not os.path.exists(self.segment_path(segment + 1)):
+                break
+            segment += 1
+        self._write_index(table, count, segment, tail)
+
+    # ----------------------------------------------
+    # -- Writes                                    |
+    # ----------------------------------------------
+    def _writing(self):
+        return _WriteLock(os.path.join(self.root, LOCK))
+
+    def extend(self, Nucleotides_collection):
+        """
+        Given a collection of Nucleotides, I append the ones not yet in the store (from any project) to the current segment.
+        I answer the number of Nucleotides that were new.
+        """
+        if self.readonly:
+            raise ValueError("the toad blob store at {} is open read only".format(self.root))
+        fresh = {}
+        for nucls in Nucleotides_collection:
+            fresh.setdefault(str(nucls.signature), nucls)
+        if not fresh:
+            return 0
+
+        with self._writing():
+            # -- another process may have written (or grown the index) since I last looked
+            self._refresh()
+            texts, hi, lo, flags = _keys(list(fresh.keys()))
+            new = np.nonzero(_probe(self._table, hi, lo, flags) < 0)[0]
+            if not len(new):
+                return 0
+
+            # -- only the new sequences are packed
+            packed = cx.twobit_encode([fresh[texts[i]].sequence for i in new.tolist()])
+            entries = np.zeros(len(new), dtype=_SLOT)
+            entries['hi'], entries['lo'], entries['flags'] = hi[new], lo[new], flags[new]
+            digests = cx._b85decode([texts[i].lstrip(cx.DnaHash.CANONICAL_MARK) for i in new.tolist()])
+
+            segment, tail = int(self._header['segment'][0]), int(self._header['tail'][0])
+            start, records, wheres = tail, [], []
+            for k, blob in enumerate(packed):
+                if (tail > 0) and (tail + _RECORD.size + len(blob) > SEGMENT_LIMIT):
+                    self._append(segment, start, records)
+                    segment, start, tail, records = segment + 1, 0, 0, []
+                records.append(_RECORD.pack(digests[k].tobytes(), int(entries['flags'][k]), len(blob)))
+                records.append(blob)
+                wheres.append((segment << _OFFSET_BITS) | (tail + _RECORD.size))
+                tail += _RECORD.size + len(blob)
+            self._append(segment, start, records)
+            entries['where'] = wheres
+            entries['size'] = [len(blob) for blob in packed]
+
+            # -- the sequences are on disk; committing the tail past them is the commit point of the batch,
+            # -- and only then are slots pointing at them written
+            self._grown(len(entries))
+            self._header['count'] += len(entries)
+            self._header['segment'], self._header['tail'] = segment, tail
+            self._header.flush()
+            _place(self._table, entries)
+            self._table.flush()
+        return len(entries)
+
+    def _append(self, segment, at, records):
+        """
+        I write records to the given segment, starting at its committed tail (at), over anything a torn append left there.
+        """
+        path = self.segment_path(segment)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as ostream:
+            ostream.seek(at)
+            ostream.write(b''.join(records))
+            ostream.truncate()
+            ostream.flush()
+            os.fsync(ostream.fileno())
+
+    # ----------------------------------------------
+    # -- Reads                                     |
+    # ----------------------------------------------
+    def _segment(self, i, end):
+        """
+        I answer a read only map of segment i that covers at least its first end bytes.
+        """
+        with self._lock:
+            m = self._maps.get(i)
+            if (m is None) or (len(m) < end):
+                if m is not None:
+                    m.close()
+                with open(self.segment_path(i), 'rb') as istream:
+                    m = self._maps[i] = mmap.mmap(istream.fileno(), 0, access=mmap.ACCESS_READ)
+            return m
+
+    def locations(self, sigs):
+        """
+        I answer (texts, where, size) for sigs; where is -1 for the signatures I do not hold.
+        """
+        self._refresh()
+        texts, hi, lo, flags = _keys(sigs)
+        table = self._table
+        slots = _probe(table, hi, lo, flags)
+        where = np.full(len(texts), -1, dtype=np.int64)
+        size = np.zeros(len(texts), dtype=np.int64)
+        held = slots >= 0
+        where[held] = table['where'][slots[held]].astype(np.int64)
+        size[held] = table['size'][slots[held]]
+        return (texts, where, size)
+
+    def __contains__(self, sig):
+        return self.locations([sig])[1][0] >= 0
+
+    def Nucleotides_many(self, sigs):
+        """
+        I answer {DnaHash text: Nucleotides} for the given signatures that I hold.
+        The sequences are read in (segment, offset) order, each straight out of its segment's memory map.
+        """
+        texts, where, size = self.locations(sigs)
+        found = {}
+        order = np.argsort(where, kind='stable')
+        order = order[where[order] >= 0].tolist()
+        where, size = where.tolist(), size.tolist()
+        low = (1 << _OFFSET_BITS) - 1
+        for i in order:
+            segment, offset = where[i] >> _OFFSET_BITS, where[i] & low
+            m = self._segment(segment, offset + size[i])
+            found[texts[i]] = cx.Nucleotides(texts[i], m[offset:offset + size[i]])
+        return found
+
+    def Nucleotides(self, sig):
+        text = _keys([sig])[0][0]
+        found = self.Nucleotides_many([text])
+        if text not in found:
+            raise KeyError(text)
+        return found[text]
+
+
+class _WriteLock:
+    """
+    I am an exclusive (fcntl.flock) lock on the store's lock file, held for one write batch.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = open(self.path, 'ab')
+        if fcntl is not None:
+            fcntl.flock(self.stream.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.stream.fileno(), fcntl.LOCK_UN)
+        self.stream.close()
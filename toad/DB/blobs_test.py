@@ -0,0 +1,136 @@
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from toad.lib import common as cx
+from toad.DB import blobs as bx
+
+
+def _hand(n, seed=0, length=60):
+    rng = random.Random(seed)
+    return [cx.Nucleotides(''.join([rng.choice('ACGT') for _ in range(length)])) for _ in range(n)]
+
+
+def _sequences(store, hand):
+    found = store.Nucleotides_many(hand)
+    return dict([(text, str(nucls.sequence)) for text, nucls in found.items()])
+
+
+def _expected(hand):
+    return dict([(str(nucls.signature), nucls.sequence) for nucls in hand])
+
+
+def _committed(store):
+    """
+    I check that every index slot points at a record below the committed tail.
+    """
+    table, header = store._table, store._header
+    taken = table[table['flags'] != 0]
+    segments = taken['where'].astype(np.int64) >> bx._OFFSET_BITS
+    offsets = taken['where'].astype(np.int64) & ((1 << bx._OFFSET_BITS) - 1)
+    current = segments == int(header['segment'][0])
+    assert np.all(offsets[current] + taken['size'][current].astype(np.int64) <= int(header['tail'][0]))
+    return len(taken)
+
+
+def test_blob_store_round_trip(tmp_path):
+    hand = _hand(200)
+    with bx.BlobStore(str(tmp_path / 'blobs')) as store:
+        assert store.extend(hand) == 200
+        assert store.extend(hand[:50] + _hand(10, seed=1)) == 10
+        assert len(store) == 210
+        assert hand[0] in store
+        assert _hand(1, seed=2)[0] not in store
+        assert _sequences(store, hand) == _expected(hand)
+        assert store.Nucleotides(hand[7].signature).sequence == hand[7].sequence
+
+    with bx.BlobStore(str(tmp_path / 'blobs'), readonly=True) as store:
+        assert len(store) == 210
+        assert _sequences(store, hand) == _expected(hand)
+
+
+def test_blob_store_reindex(tmp_path, monkeypatch):
+    monkeypatch.setattr(bx, 'SEGMENT_LIMIT', 4096)
+    root = str(tmp_path / 'blobs')
+    hand = _hand(300)
+    with bx.BlobStore(root) as store:
+        store.extend(hand)
+        assert os.path.exists(store.segment_path(1))
+
+    os.remove(os.path.join(root, bx.INDEX))
+    with bx.BlobStore(root) as store:
+        assert len(store) == 300
+        assert _sequences(store, hand) == _expected(hand)
+
+
+def test_blob_store_overwrites_a_torn_append(tmp_path):
+    root = str(tmp_path / 'blobs')
+    first, second = _hand(20), _hand(20, seed=1)
+    with bx.BlobStore(root) as store:
+        store.extend(first)
+        with open(store.segment_path(0), 'ab') as ostream:
+            ostream.write(b'\xff' * 100)  # -- a batch that never committed
+        store.extend(second)
+        assert _sequences(store, first + second) == _expected(first + second)
+        _committed(store)
+
+    os.remove(os.path.join(root, bx.INDEX))
+    with bx.BlobStore(root) as store:
+        assert len(store) == 40
+
+
+def test_blob_store_commits_the_tail_before_the_slots(tmp_path, monkeypatch):
+    root = str(tmp_path / 'blobs')
+    first, second = _hand(20), _hand(20, seed=1)
+    with bx.BlobStore(root) as store:
+        store.extend(first)
+
+    place = bx._place
+
+    def crash(table, entries):
+        place(table, entries)
+        raise KeyboardInterrupt()  # -- the process dies with the slots written, but not flushed
+
+    with monkeypatch.context() as patched:
+        patched.setattr(bx, '_place', crash)
+        with bx.BlobStore(root) as store:
+            try:
+                store.extend(second)
+            except KeyboardInterrupt:
+                pass
+
+    with bx.BlobStore(root) as store:
+        # -- every slot written points below the committed tail, so the next batch cannot clobber its record
+        assert _committed(store) == 40
+        assert store.extend(_hand(5, seed=2) + second) == 5
+        assert _committed(store) == 45
+        assert _sequences(store, first + second) == _expected(first + second)
+
+
+def _ingest(root, seeds):
+    with bx.BlobStore(root) as store:
+        for seed in seeds:
+            store.extend(_hand(50, seed=seed))
+
+
+def test_blob_store_concurrent_writers(tmp_path, monkeypatch):
+    monkeypatch.setattr(bx, 'INDEX_SLOTS', 64)  # -- so that the writers grow the index under each other
+    root = str(tmp_path / 'blobs')
+    bx.BlobStore(root).close()
+    reader = bx.BlobStore(root, readonly=True)  # -- mapped before the writers grow the index
+
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=_ingest, args=(root, [w, w + 1, w + 2, 10 + w])) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    hand = sum([_hand(50, seed=seed) for seed in list(range(6)) + [10, 11, 12, 13]], [])
+    with reader:
+        assert len(reader) == len(hand)
+        assert _sequences(reader, hand) == _expected(hand)
+        assert _committed(reader) == len(hand)
@@ -0,0 +1,99 @@
+"""
+TOAD.db.carriers
+
+I am the persistent signature -> groups ("carriers") index of a sqlite store (sqlite.Pi, and so every shard of a ShardedPi).
+For each distinct DnaHash of a kept group I hold one row (signature, group, number of runs), keyed on (DnaHash, gid),
+so that "which groups carry this sequence, and how often?" is a single b-tree probe,
+however many runs carry the signature.
+
+My rows live in the store's own file, in the carriers table, and are replaced in the same transaction
+that replaces a group's runs (see sqlite.Pi.keep_runs), so the index never disagrees with the runs.
+"""
+import toad.lib.common as cx
+
+
+LOOKUP_CHUNK = 500  # -- host parameters per "IN (...)" query
+
+
+class CarriersIndex:
+    """
+    I am the carriers index kept in the file of pi (a sqlite.Pi or ReadPi); every query runs through pi.execute,
+    so a ReadPi's readers use their own pooled connections.
+    """
+    def __init__(self, pi):
+        self.pi = pi
+
+    @staticmethod
+    def provision(db):
+        """
+        I create my table (and its by-group index) in db, filling it from the stored runs if it is new.
+        """
+        fresh = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'carriers'").fetchone() is None
+        db.execute("CREATE TABLE IF NOT EXISTS carriers (DnaHash TEXT, gid INTEGER, runs INTEGER, "
+                   "PRIMARY KEY (DnaHash, gid)) WITHOUT ROWID")
+        db.execute("CREATE INDEX IF NOT EXISTS carriers_by_group ON carriers (gid)")
+        if fresh:
+            # -- a store made before the index existed: one pass over the runs, in index order
+            db.execute("INSERT INTO carriers (DnaHash, gid, runs) "
+                       "SELECT DnaHash, gid, COUNT(*) FROM sqrls GROUP BY DnaHash, gid")
+
+    # ----------------------------------------------
+    # -- Keeping groups                            |
+    # ----------------------------------------------
+    def keep(self, gid):
+        """
+        I replace the rows of the group numbered gid from its stored runs (one range scan over its sqrls).
+        Call me inside the transaction that replaced those runs.
+        """
+        self.pi.execute("DELETE FROM carriers WHERE gid = ?", (gid,))
+        self.pi.execute("INSERT INTO carriers (DnaHash, gid, runs) "
+                        "SELECT DnaHash, gid, COUNT(*) FROM sqrls WHERE gid = ? GROUP BY DnaHash", (gid,))
+
+    update = keep
+
+    def forget(self, gid):
+        self.pi.execute("DELETE FROM carriers WHERE gid = ?", (gid,))
+
+    # ----------------------------------------------
+    # -- Lookups                                   |
+    # ----------------------------------------------
+    def census(self, sig):
+        """
+        I answer {GroupIdentifier: number of runs} for the groups carrying sig.
+        """
+        c = self.pi.execute("SELECT g.GroupIdentifier, c.runs FROM carriers c JOIN groups g ON c.gid = g.gid "
+                            "WHERE c.DnaHash = ?", (_signature_text(sig),))
+        return dict([(cx.GroupIdentifier(r[0]), r[1]) for r in c])
+
+    def carriers(self, sig):
+        """
+        I answer the list of GroupIdentifiers of the groups carrying sig.
+        """
+        return list(self.census(sig).keys())
+
+    def census_many(self, sigs):
+        """
+        I answer {DnaHash text: {GroupIdentifier: number of runs}} for the given signatures that are carried,
+        looked up with a few "IN (...)" queries rather than one query per signature.
+        """
+        sigs = sorted(set([_signature_text(sig) for sig in sigs]))
+        found = {}
+        for i in range(0, len(sigs), LOOKUP_CHUNK):
+            part = sigs[i:i + LOOKUP_CHUNK]
+            c = self.pi.execute("SELECT c.DnaHash, g.GroupIdentifier, c.runs FROM carriers c JOIN groups g ON c.gid = g.gid "
+                                "WHERE c.DnaHash IN ({})".format(','.join('?' * len(part))), part)
+            for r in c:
+                found.setdefault(r[0], {})[cx.GroupIdentifier(r[1])] = r[2]
+        return found
+
+    def carriers_many(self, sigs):
+        """
+        I answer {DnaHash text: [GroupIdentifier, ...]} (the shape every Qi answers) for the given signatures that are carried.
+        """
+        return dict([(text, list(census.keys())) for text, census in self.census_many(sigs).items()])
+
+
+def _signature_text(sig):
+    if isinstance(sig, (cx.Nucleotides, cx.SequenceAndSignature)):
+        sig = sig.signature
+    return str(sig)
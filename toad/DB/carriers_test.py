@@ -0,0 +1,95 @@
+import sqlite3
+
+from toad.lib import common as cx
+from toad.DB import shards as shx
+from toad.DB import sqlite as sx
+
+SEQUENCES = ['ACGTACGTAACC', 'TTTTGGGGCCAA', 'GATTACAGATTA', 'CCCCAAAATTTT']
+
+
+def _group(name, counts):
+    """
+    I answer a group carrying counts[i] runs of SEQUENCES[i].
+    """
+    group = cx.RunsWithMetadata(name)
+    sqrls = []
+    for i, n in enumerate(counts):
+        sqrls.extend([cx.SequenceAndSignature('M1:1:FC:1:{}:{}:{}'.format(i, j, name), cx.Nucleotides(SEQUENCES[i]), group=name)
+                      for j in range(n)])
+    group.extend(sqrls)
+    return group
+
+
+def _names(census):
+    return dict([(str(name), runs) for name, runs in census.items()])
+
+
+def _signature(i):
+    return cx.Nucleotides(SEQUENCES[i]).signature
+
+
+def test_census_follows_keep_and_forget(tmp_path):
+    with sx.Pi(str(tmp_path / 'p.db')) as pi:
+        pi.keep(_group('a', [3, 1, 0, 0]))
+        pi.keep(_group('b', [2, 0, 5, 0]))
+
+        assert _names(pi.census(_signature(0))) == {'a': 3, 'b': 2}
+        assert _names(pi.census(_signature(2))) == {'b': 5}
+        assert pi.census(_signature(3)) == {}
+        assert sorted(map(str, pi.carriers(cx.Nucleotides(SEQUENCES[0])))) == ['a', 'b']
+
+        # -- re-keeping a group replaces its rows
+        pi.keep(_group('a', [0, 4, 0, 1]))
+        assert _names(pi.census(_signature(0))) == {'b': 2}
+        assert _names(pi.census(_signature(1))) == {'a': 4}
+
+        pi.forget('b')
+        assert pi.census(_signature(0)) == {}
+        sigs = [_signature(i) for i in range(4)]
+        assert dict([(k, sorted(map(str, v))) for k, v in pi.carriers_many(sigs).items()]) == \
+            {str(_signature(1)): ['a'], str(_signature(3)): ['a']}
+        assert dict([(k, _names(v)) for k, v in pi.census_many(sigs).items()]) == \
+            {str(_signature(1)): {'a': 4}, str(_signature(3)): {'a': 1}}
+
+
+def test_census_reads_the_index_not_the_runs(tmp_path):
+    with sx.Pi(str(tmp_path / 'p.db')) as pi:
+        pi.keep(_group('a', [50, 1, 0, 0]))
+        statements = []
+        pi.db.set_trace_callback(statements.append)
+        assert _names(pi.census(_signature(0))) == {'a': 50}
+        pi.carriers_many([_signature(0), _signature(1)])
+        pi.db.set_trace_callback(None)
+        assert statements and not any(['sqrls' in statement for statement in statements])
+
+
+def test_carriers_index_fills_from_a_version_2_store(tmp_path):
+    path = str(tmp_path / 'old.db')
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE Nucleotides (DnaHash TEXT PRIMARY KEY, packed BLOB) WITHOUT ROWID")
+    db.execute("CREATE TABLE groups (gid INTEGER PRIMARY KEY, GroupIdentifier TEXT UNIQUE, signature_mode TEXT)")
+    db.execute("CREATE TABLE sqrls (gid INTEGER, UniqueRunID TEXT, DnaHash TEXT, PRIMARY KEY (gid, UniqueRunID)) WITHOUT ROWID")
+    db.execute("INSERT INTO groups VALUES (1, 'a', 'literal')")
+    db.executemany("INSERT INTO sqrls VALUES (1, ?, ?)", [('M1:1:FC:1:1:{}:1'.format(j), str(_signature(0))) for j in range(3)])
+    db.execute("PRAGMA user_version = 2")
+    db.commit()
+    db.close()
+
+    with sx.Pi(path) as pi:
+        assert _names(pi.census(_signature(0))) == {'a': 3}
+    with sx.ReadPi(path) as pi:
+        assert _names(pi.census(_signature(0))) == {'a': 3}
+
+
+def test_sharded_census_matches_a_single_file(tmp_path):
+    groups = [_group('a', [3, 1, 0, 2]), _group('b', [2, 0, 5, 0]), _group('c', [1, 1, 1, 1])]
+    sigs = [_signature(i) for i in range(4)]
+    with shx.ShardedPi(str(tmp_path / 'store'), shards=4) as store, sx.Pi(str(tmp_path / 'one.db')) as one:
+        for group in groups:
+            store.keep(group)
+            one.keep(group)
+        for sig in sigs:
+            assert _names(store.census(sig)) == _names(one.census(sig))
+        assert dict([(k, _names(v)) for k, v in store.census_many(sigs).items()]) == \
+            dict([(k, _names(v)) for k, v in one.census_many(sigs).items()])
+        assert _names(store.census(sigs[0])) == {'a': 3, 'b': 2, 'c': 1}
@@ -3,20 +3,22 @@ TOAD.mongolia
 
 I am the mongodb storage interface for TOAD.
 """
-import functools
 import glob
-import gzip
 from mimetypes import guess_type
+import multiprocessing
 import os
+import queue
 import random
 import requests
 import ssl
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 from pymongo import MongoClient
-from Bio import SeqIO
 
 from toad.lib import FASTx as fx
+from toad.lib import gzx
+from toad.lib import kmers
 
 
 def RandomMetadata():
@@ -79,8 +81,7 @@ def query_fasta(api_prefix="http://127.0.0.1:5000/api/v1", **kwargs):
 
 def create_file_handle(file):
     encoding = guess_type(file)
-    _open = functools.partial(
-        gzip.open, mode='rt') if encoding[1] == 'gzip' else open
+    _open = gzx.open_gzip if encoding[1] == 'gzip' else fx.mapped
 
     if file.endswith((".fastq", ".fq", ".fastq.gz", ".fq.gz")):
         type_ = "fastq"
@@ -108,52 +109,181 @@ def Reader(folder: str, files: list, config, verbose: bool = False) -> 0:
         all_files = files
     print(all_files)
     print(config.show())
+    workers = int(config.get('workers', 1))
+    if workers > 1 and len(all_files) > 1:
+        tally = ParallelReader(all_files, config, workers)
+        for file, report in tally.items():
+            if 'error' in report:
+                print(f'FAILED {file}: {report["error"]}')
+            else:
+                print(f'Ingested {report["records"]} sequences from {file}')
+        iter_end = time.time()
+        print(
+            f'\nProcessed {sum(report.get("records", 0) for report in tally.values())} total sequences in {iter_end - start} seconds.\n\n')
+        return 0
+
     import sys
+    index = open_kmer_index(config)
     # for file in glob.glob(f"{folder}/*"):
     for file in all_files:
         print(f'Ingesting {file}...')
         # try to get metadata from them based on config
-        _open, type_ = create_file_handle(file)
         metadata = RandomMetadata()
 
-        documents = []
-        with _open(file) as handle:
-            for cnt, record in enumerate(SeqIO.parse(handle, type_)):
-                total_sequences += 1
-                if cnt > 0 and cnt % 5000 == 0:
-                    print(f'Hopping into FastaInserter')
-                    FastaInserter(documents, config=config)
-                    iter_end = time.time()
-                    print(
-                        f'Processed {cnt} samples in {iter_end - start} seconds.')
-                    documents = []
-                if type_ == "fastq":
-                    fastq = fx.RxFASTQ(record.description, record.seq,
-                                       record.letter_annotations["phred_quality"])
-                    document = fastq.to_mongo
-                elif type_ == "fasta":
-                    fasta = fx.RxFASTA(record.description, record.seq)
-                    document = fasta.to_mongo
-                document['lab'] = config['lab']
-
-                documents.append(document)
-
-            print('Hopping into FastaInserter')
+        for documents in file_documents(file, config['lab']):
+            total_sequences += len(documents)
+            print(f'Hopping into FastaInserter')
             FastaInserter(documents, config=config)
-            print(f'Completed FastaInserter...')
+            index_documents(index, documents)
             iter_end = time.time()
             print(
-                f'\nProcessed {total_sequences} total sequences in {iter_end - start} seconds.\n\n')
+                f'Processed {total_sequences} samples in {iter_end - start} seconds.')
+
+        print(f'Completed FastaInserter...')
+        iter_end = time.time()
+        print(
+            f'\nProcessed {total_sequences} total sequences in {iter_end - start} seconds.\n\n')
+    if index:
+        index.close()
     return 0
 
 
-def MongoQuery(**kwargs):
+def file_documents(file, lab):
+    """
+    I parse, hash and convert the given sequence file into mongo documents, yielding one list of documents per batch.
+    """
+    _open, type_ = create_file_handle(file)
+    with _open(file) as handle:
+        for batch in fx.batches(handle, type_, size=fx.BATCHSIZE):
+            documents = batch.to_mongo
+            for document in documents:
+                document['lab'] = lab
+            yield documents
+
+
+def open_kmer_index(config):
+    """
+    I answer the k-mer index named by the 'kmer_index' configuration key, or None if no index is configured.
+    """
+    path, k = config.get('kmer_index'), config.get('kmer_size')
+    if not path:
+        return None
+    return kmers.KmerIndex(os.path.expanduser(path), k=int(k) if k else None)
+
+
+def index_documents(index, documents):
+    """
+    I add the sequences of a batch of documents to the k-mer index (if there is one).
+    """
+    if index is not None:
+        index.extend([document['dna'] for document in documents])
+
+
+# ---------------------------------------------------------------
+# -- Parallel ingest                                            |
+# -- Worker processes parse / hash / build documents, one file  |
+# -- at a time, and hand batches to the single writer (the     |
+# -- parent process) through a bounded queue.                  |
+# ---------------------------------------------------------------
+_outbox = None
+_stop = None
+
+
+def _init_ingest_worker(outbox, stop):
+    global _outbox, _stop
+    _outbox = outbox
+    _stop = stop
+
+
+def _ingest_file(file, lab):
+    """
+    I run in a worker process: I ingest one file and report to the writer via the outbox queue.
+    The last message for every file is either ('done', file, n) or ('failed', file, error).
+    If the writer has given up (see ParallelReader), I stop without another message.
+    """
+    n = 0
+    try:
+        for documents in file_documents(file, lab):
+            if _stop.is_set():
+                return
+            n += len(documents)
+            _outbox.put(('docs', file, documents))
+    except Exception as e:
+        _outbox.put(('failed', file, f'{type(e).__name__}: {e} (after {n} sequences)'))
+    else:
+        _outbox.put(('done', file, n))
+
+
+def ParallelReader(all_files, config, workers, backlog=None):
+    """
+    I ingest all_files using a pool of worker processes, writing every batch from this (single) process.
+    backlog bounds the number of batches waiting for the writer (default 2 per worker), so memory stays flat.
+    I answer a tally of {file: {'records': n}} or {file: {'error': message}} for each file.
+    """
+    ctx = multiprocessing.get_context()
+    outbox = ctx.Queue(maxsize=backlog or 2 * workers)
+    stop = ctx.Event()
+    # -- the tally is keyed by file, so each file is ingested (and waited for) once
+    all_files = list(dict.fromkeys(all_files))
+    index = open_kmer_index(config)
+    tally = {}
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_ingest_worker, initargs=(outbox, stop)) as pool:
+            futures = dict((pool.submit(_ingest_file, file, config['lab']), file) for file in all_files)
+            try:
+                while len(tally) < len(all_files):
+                    try:
+                        kind, file, payload = outbox.get(timeout=0.5)
+                    except queue.Empty:
+                        # -- a worker that died outright never reports; pick those up from the futures
+                        for future, file in futures.items():
+                            if future.done() and future.exception() and file not in tally:
+                                tally[file] = {'error': repr(future.exception())}
+                        continue
+
+                    if kind == 'docs':
+                        FastaInserter(payload, config=config)
+                        index_documents(index, payload)
+                    elif kind == 'done':
+                        tally[file] = {'records': payload}
+                    elif kind == 'failed':
+                        tally[file] = {'error': payload}
+            except BaseException:
+                # -- workers blocked on a full outbox would keep the pool's shutdown waiting forever:
+                # -- tell them to stop, drop the files not started yet, and drain the outbox until the rest are done
+                stop.set()
+                for future in futures:
+                    future.cancel()
+                while not all([future.done() for future in futures]):
+                    try:
+                        outbox.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                raise
+    finally:
+        if index:
+            index.close()
+    return tally
+
+
+def MongoQuery(motif=None, kmer_index=None, **kwargs):
+    '''
+    motif narrows the query to reads containing that (IUPAC) motif, found through the k-mer index at kmer_index.
+    '''
     client = MongoClient("localhost", 27017)
     db = client.toad_test
     collection = db.fastq_tests
     start = time.time()
 
     query = []
+    if motif:
+        if not kmer_index:
+            raise ValueError("searching by motif needs a k-mer index (kmer_index: path)")
+        with kmers.KmerIndex(os.path.expanduser(kmer_index), readonly=True) as index:
+            sigs = [str(sig) for sig in index.signatures(motif)]
+        query.append({"dna.0": {"$in": sigs}})
     for key, value in kwargs.items():
         query.append({key: value})
     print(f'Query:\n{query}')
@@ -0,0 +1,37 @@
+import pytest
+
+from toad.DB import mongolia as mx
+
+
+def _fastqs(folder, n, reads=3):
+    files = []
+    for i in range(n):
+        path = folder / 'f{}.fastq'.format(i)
+        path.write_text(''.join(['@M1:1:FC:1:1:{}:{} 1:N:0:1\nACGTACGT\n+\nIIIIIIII\n'.format(i, j) for j in range(reads)]))
+        files.append(str(path))
+    return files
+
+
+def test_parallel_reader_tallies_each_file_once(tmp_path, monkeypatch):
+    written = []
+    monkeypatch.setattr(mx, 'FastaInserter', lambda documents, config=None: written.extend(documents))
+    files = _fastqs(tmp_path, 4)
+
+    tally = mx.ParallelReader(files + files[:2], {'lab': 'Cross'}, workers=2)
+
+    assert sorted(tally) == sorted(files)
+    assert all([report == {'records': 3} for report in tally.values()])
+    assert len(written) == 12
+    assert all([isinstance(document['quality'], list) for document in written])
+
+
+def test_parallel_reader_raises_writer_errors(tmp_path, monkeypatch):
+    def failing(documents, config=None):
+        raise RuntimeError('mongo is down')
+
+    monkeypatch.setattr(mx, 'FastaInserter', failing)
+    files = _fastqs(tmp_path, 8)
+
+    # -- with a one batch backlog, the workers are blocked on the outbox when the writer fails
+    with pytest.raises(RuntimeError, match='mongo is down'):
+        mx.ParallelReader(files, {'lab': 'Cross'}, workers=2, backlog=1)
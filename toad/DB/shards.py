@@ -0,0 +1,354 @@
+"""
+TOAD.db.shards
+
+I am a sharded sqlite store: a directory of N sqlite.Pi files (shards), plus a manifest.
+A single sqlite file serializes its writers; here the Nucleotides and sqrls tables are partitioned by signature prefix,
+so writers of different shards (e.g. one ingest worker process per shard) never wait on each other.
+
+* a signature belongs to the shard numbered (its first 32 digest bits) * N >> 32; every shard holds one
+  contiguous range of the (sorted) signature space,
+* a group's runs are split over the shards of their signatures; every shard knows every group it was asked to keep,
+* single signature lookups go to one shard; batched and per-group queries fan out and their answers are merged.
+
+The number of shards is fixed when the store is created, and recorded (with the shard file names) in manifest.json.
+A store created with a shared blob store (see TOAD.db.blobs) records it there too; its shards then keep only signatures.
+"""
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from toad.lib import common as cx
+from toad.DB import blobs as bx
+from toad.DB import sqlite as sx
+import toad.DB.common
+
+
+SHARDS = 16  # -- default number of shards of a new store
+MANIFEST = 'manifest.json'
+MANIFEST_FORMAT = 'toad.sharded'
+
+
+def shard_numbers(sigs, shards):
+    """
+    I answer the shard number of each of sigs (DnaHash values or their text), as an int64 array.
+    """
+    texts = [str(sig).lstrip(cx.DnaHash.CANONICAL_MARK) for sig in sigs]
+    if not texts:
+        return np.empty(0, dtype=np.int64)
+    prefixes = cx._b85decode(texts)[:, :4].copy().view('>u4')[:, 0].astype(np.uint64)
+    return ((prefixes * np.uint64(shards)) >> np.uint64(32)).astype(np.int64)
+
+
+# -------------------------------------------------------------
+# -- Shard writes, run either here or in a worker process     |
+# -- (which opens only the one shard file it writes).         |
+# -------------------------------------------------------------
+def _extend_shard(pi, hand):
+    return pi.extend(hand)
+
+
+def _keep_shard(pi, GroupIdentifier, rows, hand, signature_mode):
+    pi.keep_runs(GroupIdentifier, rows, hand, signature_mode)
+
+
+def _in_shard(path, job, *args):
+    with sx.Pi(path) as pi:
+        return job(pi, *args)
+
+
+class ShardedPi(toad.DB.common.Qi, toad.DB.common.Pi):
+    """
+    I am the router over the shards of a store kept in the directory root.
+    Given shards=N, I create the store (if root holds none yet); otherwise I open the store recorded in root's manifest.
+    With readonly=True, every shard is a sqlite.ReadPi (pooled, per thread read-only connections).
+    Given blobs (a blob store's directory), sequences are kept in that blob store, shared by all of my shards.
+    """
+    def __init__(self, root, shards=None, readonly=False, blobs=None):
+        self.root = root
+        self.readonly = readonly
+        path = os.path.join(root, MANIFEST)
+        if readonly and not os.path.exists(path):
+            raise ValueError("there is no sharded toad store at {}".format(root))
+        if os.path.exists(path):
+            with open(path, 'rt') as istream:
+                self.manifest = json.load(istream)
+            if self.manifest.get('format') != MANIFEST_FORMAT:
+                raise ValueError("{} is not the manifest of a sharded toad store".format(path))
+            if (shards is not None) and (shards != self.manifest['shards']):
+                raise ValueError("the store at {} has {} shards, not {}".format(root, self.manifest['shards'], shards))
+        else:
+            shards = SHARDS if (shards is None) else shards
+            if not 0 < shards <= 4096:
+                raise ValueError("a sharded store needs 1 to 4096 shards, not {}".format(shards))
+            self.manifest = {
+                'format': MANIFEST_FORMAT, 'schema': sx.SCHEMA_VERSION, 'partition': 'DnaHash prefix',
+                'shards': shards, 'files': ['shard-{:04d}.db'.format(i) for i in range(shards)],
+            }
+            if blobs is not None:
+                self.manifest['blobs'] = os.path.abspath(blobs)
+            os.makedirs(root, exist_ok=True)
+            self._write_manifest()
+
+        self.shards = self.manifest['shards']
+        self.paths = [os.path.join(root, name) for name in self.manifest['files']]
+        self._pis = [None] * self.shards
+        blobs = blobs if (blobs is not None) else self.manifest.get('blobs')
+        self.blobs = None if (blobs is None) else bx.BlobStore(blobs, readonly=readonly)
+
+    def _write_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + '.tmp', 'wt') as ostream:
+            json.dump(self.manifest, ostream, indent=3)
+        os.replace(path + '.tmp', path)
+
+    def pi(self, i):
+        """
+        I answer the (lazily opened) sqlite.Pi of shard i.
+        """
+        if self._pis[i] is None:
+            if self.readonly:
+                self._pis[i] = sx.ReadPi(self.paths[i], blobs=self.blobs)
+            else:
+                self._pis[i] = sx.Pi(self.paths[i], blobs=self.blobs)
+        return self._pis[i]
+
+    def close(self):
+        for pi in self._pis:
+            if pi is not None:
+                pi.close()
+        self._pis = [None] * self.shards
+        if self.blobs is not None:
+            self.blobs.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def shard_of(self, sig):
+        if isinstance(sig, (cx.Nucleotides, cx.SequenceAndSignature)):
+            sig = sig.signature
+        return int(shard_numbers([sig], self.shards)[0])
+
+    def _split(self, items, sig_of):
+        """
+        I answer [items of shard 0, items of shard 1, ...], given sig_of(item) -> its signature.
+        """
+        parts = [[] for i in range(self.shards)]
+        numbers = shard_numbers([sig_of(item) for item in items], self.shards).tolist()
+        for item, i in zip(items, numbers):
+            parts[i].append(item)
+        return parts
+
+    def _run(self, job, argss, workers):
+        """
+        I run job(shard's Pi, *args) for every (shard, args) pair in argss: here, or on a pool of worker processes.
+        """
+        if workers <= 1:
+            return [job(self.pi(i), *args) for i, args in argss]
+        # -- my own connections are closed first, so that none holds a shard open while a worker writes it
+        self.close()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context()) as pool:
+            jobs = [pool.submit(_in_shard, self.paths[i], job, *args) for i, args in argss]
+            return [done.result() for done in jobs]
+
+    # ----------------------------------------------
+    # -- Writes                                    |
+    # ----------------------------------------------
+    def extend(self, Nucleotides_collection, workers=1):
+        """
+        Given a collection of Nucleotides, I add the new ones to their shards (on workers processes, if workers > 1),
+        or to my blob store, if I have one. I answer the number of Nucleotides that were new.
+        """
+        if self.blobs is not None:
+            return self.blobs.extend(Nucleotides_collection)
+        parts = self._split(list(Nucleotides_collection), lambda nucls: nucls.signature)
+        return sum(self._run(_extend_shard, [(i, (part,)) for i, part in enumerate(parts) if part], workers))
+
+    def keep(self, group, workers=1):
+        """
+        I store the given group (RunsWithMetadata or GroupSnapshot), replacing any earlier version of it.
+        Every shard is told about the group, so that runs it no longer has are dropped everywhere.
+        """
+        self._check_signature_mode(group.signature_mode)
+        name = str(group.GroupIdentifier)
+        rows = self._split([(str(sqrl.ID), str(sqrl.signature)) for sqrl in group], lambda row: row[1])
+        if self.blobs is not None:
+            # -- the sequences go to the blob store once, here; the shards (and their workers) get only runs
+            self.blobs.extend(group.hand())
+            hands = [[] for i in range(self.shards)]
+        else:
+            hands = self._split(list(group.hand()), lambda nucls: nucls.signature)
+        self._run(_keep_shard, [(i, (name, rows[i], hands[i], group.signature_mode)) for i in range(self.shards)],
+                  workers)
+
+    update = keep
+
+    @property
+    def signature_mode(self):
+        """
+        I answer the DnaHash mode of every group in my store (recorded in my manifest), or None before one is kept.
+        """
+        return self.manifest.get('signature_mode')
+
+    def _check_signature_mode(self, signature_mode):
+        """
+        I record signature_mode in my manifest when the first group is kept, and raise ValueError on any other after that.
+        (Each shard checks it again, against its own record, when it keeps its part of a group.)
+        """
+        if signature_mode is None:
+            return
+        if self.signature_mode is None:
+            self.manifest['signature_mode'] = signature_mode
+            self._write_manifest()
+        elif self.signature_mode != signature_mode:
+            raise ValueError("cannot keep a group of {} signatures in the {} store at {}".format(
+                signature_mode, self.signature_mode, self.root))
+
+    def forget(self, GroupIdentifier):
+        for i in range(self.shards):
+            self.pi(i).forget(GroupIdentifier)
+
+    # ----------------------------------------------
+    # -- Queries (see TOAD.db.common.Qi)           |
+    # ----------------------------------------------
+    def carriers(self, Nucleotides):
+        return self.pi(self.shard_of(Nucleotides)).carriers(Nucleotides)
+
+    def census(self, sig):
+        return self.pi(self.shard_of(sig)).census(sig)
+
+    def SignatureAndGroupes(self, sig, groups_context=None):
+        return self.pi(self.shard_of(sig)).SignatureAndGroupes(sig, groups_context)
+
+    def Nucleotides(self, sig):
+        if self.blobs is not None:
+            return self.blobs.Nucleotides(sig)
+        return self.pi(self.shard_of(sig)).Nucleotides(sig)
+
+    def Nucleotides_many(self, sigs):
+        """
+        I answer {DnaHash text: Nucleotides} for the given signatures, one batched query per shard concerned
+        (or a single batch from my blob store, if I have one).
+        """
+        if self.blobs is not None:
+            return self.blobs.Nucleotides_many(sigs)
+        found = {}
+        for i, part in enumerate(self._split(list(sigs), sx._signature_text)):
+            if part:
+                found.update(self.pi(i).Nucleotides_many(part))
+        return found
+
+    def carriers_many(self, sigs):
+        """
+        I answer {DnaHash text: [GroupIdentifier, ...]} for the given signatures, one batched query per shard concerned.
+        """
+        found = {}
+        for i, part in enumerate(self._split(list(sigs), sx._signature_text)):
+            if part:
+                found.update(self.pi(i).carriers_many(part))
+        return found
+
+    def census_many(self, sigs):
+        """
+        I answer {DnaHash text: {GroupIdentifier: number of runs}} for the given signatures, one batched query per shard concerned.
+        """
+        found = {}
+        for i, part in enumerate(self._split(list(sigs), sx._signature_text)):
+            if part:
+                found.update(self.pi(i).census_many(part))
+        return found
+
+    def group(self, GroupIdentifier):
+        """
+        I rebuild the named group from its runs in every shard.
+        """
+        signature_mode, sqrls, known = None, [], False
+        for i in range(self.shards):
+            try:
+                mode, part = self.pi(i).runs_of(GroupIdentifier)
+            except KeyError:
+                continue
+            known = True
+            if (mode is not None) and (signature_mode is not None) and (mode != signature_mode):
+                raise ValueError("the shards of {} hold {} and {} signatures for group {}".format(
+                    self.root, signature_mode, mode, GroupIdentifier))
+            signature_mode = signature_mode or mode
+            sqrls.extend(part)
+        if not known:
+            raise KeyError(str(GroupIdentifier))
+        group = cx.RunsWithMetadata(GroupIdentifier, signature_mode=signature_mode)
+        group.extend(sqrls, cross_check=False)
+        return group
+
+    def group_names(self):
+        names = set()
+        for i in range(self.shards):
+            names.update(self.pi(i).groups.keys())
+        return sorted(names)
+
+    def SequenceAndSignature(self, run):
+        for i in range(self.shards):
+            try:
+                return self.pi(i).SequenceAndSignature(run)
+            except KeyError:
+                continue
+        raise KeyError(str(run))
+
+    def __len__(self):
+        """
+        I answer the number of Nucleotides I hold (in my blob store, if I have one).
+        """
+        if self.blobs is not None:
+            return len(self.blobs)
+        return sum([len(self.pi(i).sequences) for i in range(self.shards)])
+
+    def __getitem__(self, oid):
+        if isinstance(oid, cx.UniqueRunID):
+            return self.SequenceAndSignature(oid)
+        if isinstance(oid, cx.GroupIdentifier):
+            return self.group(oid)
+        if isinstance(oid, cx.DnaHash):
+            return self.Nucleotides(oid)
+        raise ValueError(
+            "{} is not associated with any persistent object type".format(str(oid)))
+
+    def __contains__(self, oid):
+        if isinstance(oid, cx.UniqueRunID):
+            # -- runs are placed by their signature, so any shard may hold one
+            return any(oid in self.pi(i) for i in range(self.shards))
+        if isinstance(oid, cx.GroupIdentifier):
+            return any(oid in self.pi(i) for i in range(self.shards))
+        if isinstance(oid, cx.DnaHash):
+            if self.blobs is not None:
+                return oid in self.blobs
+            return oid in self.pi(self.shard_of(oid))
+        raise ValueError(
+            "{} is not associated with any persistent object type".format(str(oid)))
+
+
+_READERS = {}
+_READERS_LOCK = threading.Lock()
+
+
+def store_reader(path, blobs=None):
+    """
+    I answer a shared, read-only store for path (a sharded store's directory, or a single sqlite file), ...
+    opened once per process, so that e.g. every request handler of the API reuses the same warm connections.
+    blobs is the directory of the blob store that holds the store's sequences, if any.
+    """
+    path = os.path.abspath(path)
+    with _READERS_LOCK:
+        reader = _READERS.get(path)
+        if reader is None:
+            if os.path.isdir(path):
+                reader = ShardedPi(path, readonly=True, blobs=blobs)
+            else:
+                reader = sx.ReadPi(path, blobs=blobs)
+            _READERS[path] = reader
+    return reader
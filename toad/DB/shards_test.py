@@ -0,0 +1,123 @@
+import json
+import random
+
+import pytest
+
+from toad.lib import common as cx
+from toad.DB import shards as shx
+from toad.DB import sqlite as sx
+
+
+def _group(name, n, seed=0):
+    rng = random.Random(seed)
+    seqs = [''.join([rng.choice('ACGT') for _ in range(40)]) for _ in range(n // 2)]
+    group = cx.RunsWithMetadata(name)
+    group.extend([cx.SequenceAndSignature('M1:1:FC:1:{}:{}:1'.format(seed, i), cx.Nucleotides(seqs[i % len(seqs)]), group=name)
+                  for i in range(n)], cross_check=False)
+    return group
+
+
+def _rows(group):
+    return sorted([(str(sqrl.ID), str(sqrl.signature), sqrl.sequence) for sqrl in group])
+
+
+def _carried(found):
+    return dict([(text, sorted(map(str, names))) for text, names in found.items()])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_sharded_store_round_trip(tmp_path, workers):
+    a, b = _group('a', 60), _group('b', 40, seed=1)
+    with shx.ShardedPi(str(tmp_path / 'store'), shards=4) as store:
+        store.keep(a, workers=workers)
+        store.keep(b, workers=workers)
+        assert _rows(store.group('a')) == _rows(a)
+        assert _rows(store.group('b')) == _rows(b)
+        assert [str(name) for name in store.group_names()] == ['a', 'b']
+        assert next(iter(a)).ID in store
+
+        # -- re-keeping a smaller group drops its stale runs from every shard
+        smaller = _group('a', 10)
+        store.keep(smaller, workers=workers)
+        assert _rows(store.group('a')) == _rows(smaller)
+
+    with pytest.raises(ValueError):
+        shx.ShardedPi(str(tmp_path / 'store'), shards=8)
+
+
+def test_sharded_store_answers_as_a_single_file(tmp_path):
+    a, b = _group('a', 60), _group('b', 40, seed=1)
+    shared = next(iter(a)).signature
+    b.add(cx.SequenceAndSignature('M1:1:FC:1:9:9:1', next(iter(a.hand())), group='b'), cross_check=False)
+    sigs = [nucls.signature for nucls in list(a.hand()) + list(b.hand())]
+
+    with shx.ShardedPi(str(tmp_path / 'store'), shards=4) as store, sx.Pi(str(tmp_path / 'one.db')) as one:
+        for group in (a, b):
+            store.keep(group)
+            one.keep(group)
+        assert _carried(store.carriers_many(sigs)) == _carried(one.carriers_many(sigs))
+        assert sorted(map(str, store.carriers(shared))) == sorted(map(str, one.carriers(shared)))
+        assert store.census(shared) == one.census(shared)
+        found = store.Nucleotides_many(sigs)
+        assert dict([(k, v.sequence) for k, v in found.items()]) == \
+            dict([(k, v.sequence) for k, v in one.Nucleotides_many(sigs).items()])
+
+
+def test_sharded_store_with_blobs(tmp_path):
+    a = _group('a', 60)
+    with shx.ShardedPi(str(tmp_path / 'store'), shards=4, blobs=str(tmp_path / 'blobs')) as store:
+        store.keep(a, workers=2)
+        assert len(store) == len(a.hand())
+    with shx.ShardedPi(str(tmp_path / 'store'), readonly=True) as store:
+        assert store.blobs is not None
+        assert len(store) == len(a.hand())
+        assert _rows(store.group('a')) == _rows(a)
+
+
+def test_sharded_store_keeps_one_signature_mode(tmp_path):
+    literal = _group('a', 20)
+    canonical = cx.RunsWithMetadata('b')
+    canonical.extend([cx.SequenceAndSignature('M1:1:FC:1:8:{}:1'.format(i), cx.Nucleotides('ACGTTGCA' * (i + 1), canonical=True),
+                                              group='b') for i in range(10)])
+    with shx.ShardedPi(str(tmp_path / 'store'), shards=4) as store:
+        store.keep(literal)
+        with pytest.raises(ValueError):
+            store.keep(canonical)
+    with shx.ShardedPi(str(tmp_path / 'store')) as store:
+        assert store.signature_mode == 'literal'
+        with pytest.raises(ValueError):
+            store.keep(canonical)
+        assert [str(name) for name in store.group_names()] == ['a']
+        assert store.group('a').signature_mode == 'literal'
+
+
+def test_shard_numbers_split_the_sorted_signature_space():
+    rng = random.Random(0)
+    hand = [cx.Nucleotides(''.join([rng.choice('ACGT') for _ in range(30)])) for _ in range(500)]
+    sigs = [nucls.signature for nucls in hand]
+    digests = cx._b85decode([str(sig) for sig in sigs])
+    order = sorted(range(len(sigs)), key=lambda i: bytes(digests[i]))
+
+    numbers = shx.shard_numbers(sigs, 16)
+    assert numbers.min() >= 0 and numbers.max() < 16
+    assert list(numbers[order]) == sorted(numbers)  # -- each shard is one contiguous range
+    assert len(set(numbers.tolist())) > 8
+    assert set(shx.shard_numbers(sigs, 1).tolist()) == {0}
+    # -- canonical signatures go where their digest does
+    canonical = [cx.Nucleotides(str(nucls.sequence), canonical=True).signature for nucls in hand[:20]]
+    assert list(shx.shard_numbers(canonical, 16)) == list(shx.shard_numbers([str(sig).lstrip('.') for sig in canonical], 16))
+
+
+def test_sharded_store_puts_rows_in_their_shard(tmp_path):
+    a = _group('a', 80)
+    with shx.ShardedPi(str(tmp_path / 'store'), shards=4) as store:
+        store.extend(a.hand(), workers=2)
+        assert len(store) == len(a.hand())
+        for i in range(store.shards):
+            keys = store.pi(i).sequences.keys()
+            assert all([store.shard_of(sig) == i for sig in keys])
+        assert sum([len(store.pi(i).sequences) for i in range(store.shards)]) == len(a.hand())
+        assert store.extend(a.hand()) == 0
+        with open(str(tmp_path / 'store' / shx.MANIFEST)) as istream:
+            manifest = json.load(istream)
+        assert manifest['shards'] == 4 and len(manifest['files']) == 4
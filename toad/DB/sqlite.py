@@ -1,244 +1,558 @@
-# """
-# TOAD.db.sqlite
-
-# I am the sqlite storage subsystem.
-# Each project (which can have multiple groups associated) is a single sqlite file.
-# """
-# import sqlite3
-# import logging
-
-# from TOAD.common import *
-# import TOAD.db.common
-
-# logger = logging.getLogger(__name__)
-
-
-# class axsNucleotides:
-#     def __init__(self, pi):
-#         self.pi = pi
-
-#     def __getitem__(self, k):
-#         if isinstance(k, DnaHash):
-#             c = self.pi.execute(
-#                 "SELECT * FROM axs WHERE DnaHash = ?", (str(k),))
-#             r = c.fetchone()
-#             if r is not None:
-#                 return axs(r['DnaHash'], r['gzsequence'])
-#             else:
-#                 raise KeyError(k)
-
-#     def __contains__(self, k):
-#         return self.pi.exists('axs', 'DnaHash', str(k))
-
-#     def __len__(self):
-#         c = self.pi.execute("SELECT COUNT(*) AS tallied from axs")
-#         r = c.fetchone()
-#         return r['tallied']
-
-#     def keys(self):
-#         c = self.pi.execute("SELECT DnaHash FROM axs")
-#         return [enDnaHash(r['DnaHash']) for r in c]
-
-#     def __iter__(self):
-#         for k in self.keys():
-#             yield self[as_DnaHash(k)]
-
-
-# class axsRunsWithMetadatas:
-#     def __init__(self, pi):
-#         self.pi = pi
-
-#     def keys(self):
-#         c = self.pi.execute(
-#             "SELECT RunsWithMetadataIdentifier FROM groups ORDER BY RunsWithMetadataIdentifier")
-#         return [RunsWithMetadataIdentifier(r['RunsWithMetadataIdentifier']) for r in c]
-
-#     def __len__(self):
-#         c = self.pi.execute("SELECT COUNT(*) AS tallied FROM groups")
-#         r = c.fetchone()
-#         return r['tallied']
-
-#     def __contains__(self, RunsWithMetadataIdentifier):
-#         return self.pi.exists('groups', 'RunsWithMetadataIdentifier', str(RunsWithMetadataIdentifier))
-
-#     def __getitem__(self, RunsWithMetadataIdentifier):
-#         c = self.pi.execute(
-#             "SELECT RunsWithMetadataIdentifier, sqrls FROM groups WHERE RunsWithMetadataIdentifier = ?", (str(RunsWithMetadataIdentifier),))
-#         r = c.fetchone()
-#         if r is None:
-#             raise KeyError(str(RunsWithMetadataIdentifier))
-#         else:
-#             g = RunsWithMetadata.fromJSON(r['sqrls'])
-#             return g
-
-#     def __iter__(self):
-#         for k in self.keys():
-#             yield self[k]
-
-
-# class Pi(TOAD.db.common.Pi):
-#     def __init__(self, db_path):
-#         logger.debug("opening db at {}".format(db_path))
-#         self.db = sqlite3.connect(db_path)
-#         self.db.row_factory = sqlite3.Row
-#         self.provision()
-
-#         # -----------------------------
-#         # -- Some special accessors...|
-#         # -----------------------------
-#         self.axs = axsaxs(self)
-#         self.groups = axsRunsWithMetadatas(self)
-
-#     def execute(self, query, quargs=None):
-#         c = self.db.cursor()
-#         if quargs:
-#             return c.execute(query, quargs)
-#         else:
-#             return c.execute(query)
-
-#     def commit(self):
-#         self.db.commit()
-
-#     def close(self):
-#         self.db.close()
-
-#     def provision(self):
-#         self.db.execute(
-#             "CREATE TABLE IF NOT EXISTS Nucleotides   (DnaHash  TEXT PRIMARY KEY, gzsequence BLOB)")
-# # self.db.execute("CREATE TABLE IF NOT EXISTS sqrls   (UniqueRunID TEXT PRIMARY KEY, RunsWithMetadataIdentifier TEXT, sig TEXT)")
-#         self.db.execute(
-#             "CREATE TABLE IF NOT EXISTS groups  (RunsWithMetadataIdentifier  TEXT PRIMARY KEY, sqrls BLOB)")
-
-#         self.db.execute(
-#             "CREATE TABLE IF NOT EXISTS SignatureAndRunsWithMetadataes(DnaHash TEXT, RunsWithMetadataIdentifier TEXT, members BLOB)")
-#         self.db.execute(
-#             "CREATE INDEX IF NOT EXISTS SignatureAndRunsWithMetadataes_DnaHashes ON SignatureAndRunsWithMetadataes(DnaHash)")
-#         self.db.execute(
-#             "CREATE INDEX IF NOT EXISTS SignatureAndRunsWithMetadataes_RunsWithMetadataIdentifiers ON SignatureAndRunsWithMetadataes(RunsWithMetadataIdentifier)")
-
-# # self.db.execute("CREATE TABLE IF NOT EXISTS carriers(DnaHash TEXT, RunsWithMetadataIdentifiers BLOB)")
-# # self.db.execute("CREATE INDEX IF NOT EXISTS carriers_DnaHashes ON carriers(DnaHash)")
-
-#     def find_one(self, tbl, k, v):
-#         """
-#         Answers a single row from the given table (tbl) where column (k) has value (v).
-#         If no such row exists, I answer None.
-#         """
-#         c = self.execute(
-#             "SELECT {} FROM {} WHERE ({} = ?) LIMIT 1".format(tbl, k, v), v)
-#         return c.fetchone()
-
-#     def exists(self, tbl, k, v):
-#         """
-#         Performs a simple existence query that table (tbl) has at least one row where column (k) has value (v).
-#         """
-#         r = self.lookup(tbl, k, v)
-#         if r is not None:
-#             return True
-#         else:
-#             return False
-
-#     def carriers(self, DnaHash):
-#         """
-#         I answer the set of all groups that have at least one instance of the given Nucleotides.
-#         """
-#         c = self.execute(
-#             "SELECT RunsWithMetadataIdentifier FROM SignatureAndRunsWithMetadataes WHERE (DnaHash = ?)", (str(DnaHash),))
-#         return [RunsWithMetadataIdentifier(r['RunsWithMetadataIdentifier']) for r in c]
-
-#     def DnaHashes(self, pagenum, n=1000000):
-#         """
-#         I query the Nucleotides collection and answer a page of DnaHash instances of size <= n.
-#         pagenum is the query page (increments of n) starting from 0.
-#         """
-#         c = self.execute(
-#             "SELECT DnaHash FROM Nucleotides ORDER BY DnaHash LIMIT {} OFFSET {}".format(n, pagenum*n))
-#         page = set([DnaHash(row['DnaHash']) for row in c])
-#         return page
-
-#     def extend(self, Nucleotides_collection):
-#         """
-#         Given a collection of Nucleotides instances,
-#         I add any new (relative to the state of my current Nucleotides table) Nucleotides instances to my persistent collection.
-#         """
-#         # -- First, we'll filter the given Nucleotides_collection by removing any Nucleotides that we have already stored.
-#         i = 0
-#         page = self.DnaHashes(i)
-#         keepers = list(Nucleotides_collection)
-#         while page:
-#             considering = keepers
-#             keepers = [
-#                 Nucleotides for Nucleotides in considering if Nucleotides.signature not in page]
-#             i += 1
-#             page = self.DnaHashes(i)
-
-#         # -- by the time we get here, the "keepers" list should include only those ...
-#         # -- ... Nucleotides that we do not already have stored.
-#         inset = [(str(Nucleotides.signature), Nucleotides.gzsequence)
-#                  for Nucleotides in keepers]
-#         c = self.db.cursor()
-#         c.executemany(
-#             "INSERT OR IGNORE INTO Nucleotides (DnaHash, gzsequence) VALUES (?, ?)", inset)
-
-#     def keep(self, group):
-#         """
-#         I add a given instance of TOAD.RunsWithMetadata to my persistent storage.
-#         """
-#         # --------------
-#         # -- Add Nucleotides |
-#         # --------------
-#         self.extend(group.hand())
-
-#         # ---------------------
-#         # -- Add group RunsRoster |
-#         # ---------------------
-#         doc = group.toJSON("-Nucleotides", "-SignatureAndRunsWithMetadataes")
-#         self.execute(
-#             "INSERT OR REPLACE INTO groups (RunsWithMetadataIdentifier, sqrls) VALUES (?, ?)", (group.RDN, doc))
-
-#         # --------------------------------------------------
-#         # -- Add SignatureAndRunsWithMetadataes for fast look up / census taking |
-#         # --------------------------------------------------
-#         self.execute(
-#             "DELETE FROM SignatureAndRunsWithMetadataes WHERE RunsWithMetadataIdentifier = ?", (group.RDN,))
-#         blocks = []
-#         for sig in group.SignatureAndRunsWithMetadataes:
-#             SignatureAndRunsWithMetadata = group.SignatureAndRunsWithMetadata(
-#                 sig)
-#             blocks.append((SignatureAndRunsWithMetadata.RDN, str(
-#                 SignatureAndRunsWithMetadata.group), SignatureAndRunsWithMetadata.toJSON()))
-#         c = self.db.cursor()
-#         c.executemany(
-#             "INSERT INTO SignatureAndRunsWithMetadataes (DnaHash, RunsWithMetadataIdentifier, members) VALUES (?, ?, ?)", blocks)
-
-#     def __getitem__(self, oid):
-#         if isinstance(oid, UniqueRunID):
-#             # -- look for a sqrl...
-#             return self.SequenceAndSignature(oid)
-
-#         if isinstance(oid, RunsWithMetadataIdentifier):
-#             # -- look for a group...
-#             return self.group(oid)
-
-#         if isinstance(oid, DnaHash):
-#             # -- look for a Nucleotides
-#             return self.Nucleotides(oid)
-
-#         raise ValueError(
-#             "{} is not associated with any persistent object type".format(str(oid)))
-
-#     def __contains__(self, oid):
-#         if isinstance(oid, UniqueRunID):
-#             # -- look for a sqrl...
-#             return self.exists("sqrls", "UniqueRunID", str(oid))
-
-#         if isinstance(oid, RunsWithMetadataIdentifier):
-#             # -- look for a group...
-#             return self.exists("groups", "RunsWithMetadataIdentifier", str(oid))
-
-#         if isinstance(oid, DnaHash):
-#             # -- look for a Nucleotides
-#             return self.exists("Nucleotides", "DnaHash", str(oid))
-
-#         raise ValueError(
-#             "{} is not associated with any persistent object type".format(str(oid)))
+"""
+TOAD.db.sqlite
+
+I am the sqlite storage subsystem.
+Each project (which can have multiple groups associated) is a single sqlite file.
+
+Bulk loads are the common case (a whole ingest batch at a time), so:
+* the file runs in WAL mode with relaxed syncing, a large page cache and in-memory temp tables,
+* every bulk write is one explicit transaction of executemany calls, with rows sorted by key,
+* de-duplication is left to sqlite (INSERT OR IGNORE against the primary key), never done by paging keys into python.
+
+Runs are stored normalized, one row per run (UniqueRunID, group, DnaHash), with indexes that cover the common lookups:
+* sqrls' primary key (gid, UniqueRunID) - a group is read back with one range scan,
+* sqrls_runs (UniqueRunID)               - "is this run stored?" is an index only seek,
+* sqrls_signatures (DnaHash, gid)        - per-signature members never touch the table itself.
+
+Each file also holds a carriers index (see TOAD.db.carriers): one row per (signature, group) with its number of runs,
+replaced in the transaction that keeps the group, so carriers / census are a single probe however common a signature is.
+
+Given a shared blob store (see TOAD.db.blobs), a project file keeps only signatures:
+new sequences go to the blob store (if no project has put them there yet), and are read back from it in batches.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from urllib.request import pathname2url
+
+from toad.lib import common as cx
+from toad.DB import blobs as bx
+from toad.DB import carriers as kx
+import toad.DB.common
+
+
+logger = logging.getLogger(__name__)
+
+EXTEND_CHUNK = 100000  # -- Nucleotides packed and inserted per executemany call
+LOOKUP_CHUNK = 500  # -- host parameters per "IN (...)" query
+SCHEMA_VERSION = 3  # -- kept in PRAGMA user_version
+UPGRADABLE = (2,)  # -- versions that are brought up to SCHEMA_VERSION when opened for writing
+
+READERS = 16  # -- idle read-only connections a ReaderPool keeps warm
+STATEMENT_CACHE = 256  # -- prepared statements cached per read-only connection
+MMAP_SIZE = 1 << 28  # -- bytes of a store each read-only connection reads through a memory map (256 MiB)
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # -- WAL stays consistent; only the last transactions are at risk on power loss
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",  # -- 64 MiB
+    "PRAGMA wal_autocheckpoint = 10000",
+)
+
+
+class axsNucleotides:
+    """
+    I am the (read-only) accessor for the stored Nucleotides of a Pi, keyed by DnaHash.
+    """
+    def __init__(self, pi):
+        self.pi = pi
+
+    def __getitem__(self, k):
+        found = self.pi.Nucleotides_many([k])
+        if str(k) not in found:
+            raise KeyError(k)
+        return found[str(k)]
+
+    def __contains__(self, k):
+        if self.pi.exists('Nucleotides', 'DnaHash', str(k)):
+            return True
+        return (self.pi.blobs is not None) and (str(k) in self.pi.blobs)
+
+    def __len__(self):
+        return self.pi.execute("SELECT COUNT(*) AS tallied FROM Nucleotides").fetchone()['tallied']
+
+    def keys(self):
+        return [cx.as_DnaHash(r['DnaHash']) for r in self.pi.execute("SELECT DnaHash FROM Nucleotides")]
+
+    def __iter__(self):
+        c = self.pi.execute("SELECT DnaHash, packed FROM Nucleotides")
+        for r in c:
+            yield cx.Nucleotides(r['DnaHash'], r['packed'])
+
+
+class axsRunsWithMetadatas:
+    """
+    I am the (read-only) accessor for the stored groups of a Pi, keyed by GroupIdentifier.
+    """
+    def __init__(self, pi):
+        self.pi = pi
+
+    def keys(self):
+        c = self.pi.execute("SELECT GroupIdentifier FROM groups ORDER BY GroupIdentifier")
+        return [cx.GroupIdentifier(r['GroupIdentifier']) for r in c]
+
+    def __len__(self):
+        return self.pi.execute("SELECT COUNT(*) AS tallied FROM groups").fetchone()['tallied']
+
+    def __contains__(self, GroupIdentifier):
+        return self.pi.exists('groups', 'GroupIdentifier', str(GroupIdentifier))
+
+    def __getitem__(self, GroupIdentifier):
+        return self.pi.group(GroupIdentifier)
+
+    def __iter__(self):
+        for k in self.keys():
+            yield self[k]
+
+
+class Pi(toad.DB.common.Qi, toad.DB.common.Pi):
+    """
+    I am the project store in the sqlite file at db_path.
+    Given blobs (a blobs.BlobStore, or its directory), my sequences are kept there rather than in my own file.
+    """
+    def __init__(self, db_path, blobs=None):
+        logger.debug("opening db at {}".format(db_path))
+        self.db_path = db_path
+        self.blobs = _blob_store(blobs, readonly=False)
+        # -- transactions are explicit (see transaction), so the module's implicit ones are turned off
+        self.db = sqlite3.connect(db_path, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            self.db.execute(pragma)
+        self.provision()
+
+        # -----------------------------
+        # -- Some special accessors...|
+        # -----------------------------
+        self.sequences = axsNucleotides(self)
+        self.groups = axsRunsWithMetadatas(self)
+        self.carriers_index = kx.CarriersIndex(self)
+
+    def execute(self, query, quargs=None):
+        c = self.db.cursor()
+        if quargs:
+            return c.execute(query, quargs)
+        else:
+            return c.execute(query)
+
+    def transaction(self):
+        """
+        I answer a context manager that wraps its block in one (BEGIN ... COMMIT / ROLLBACK) transaction.
+        """
+        return _Transaction(self.db)
+
+    def commit(self):
+        if self.db.in_transaction:
+            self.db.execute("COMMIT")
+
+    def close(self):
+        self.commit()
+        self.db.close()
+        if self.blobs is not None:
+            self.blobs.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def provision(self):
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        tables = self.db.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+        if tables and (version != SCHEMA_VERSION) and (version not in UPGRADABLE):
+            raise ValueError("{} holds a version {} toad store, not version {}".format(self.db_path, version, SCHEMA_VERSION))
+
+        with self.transaction():
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS Nucleotides (DnaHash TEXT PRIMARY KEY, packed BLOB) WITHOUT ROWID")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS groups (gid INTEGER PRIMARY KEY, GroupIdentifier TEXT UNIQUE, signature_mode TEXT)")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS sqrls (gid INTEGER, UniqueRunID TEXT, DnaHash TEXT, "
+                "PRIMARY KEY (gid, UniqueRunID)) WITHOUT ROWID")
+            # -- entries of an index on a WITHOUT ROWID table carry the primary key, so these two cover their queries
+            self.db.execute("CREATE INDEX IF NOT EXISTS sqrls_runs ON sqrls (UniqueRunID)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS sqrls_signatures ON sqrls (DnaHash, gid)")
+            # -- store wide settings; 'signature_mode' is fixed by the first group kept (see _check_signature_mode)
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            modes = [r[0] for r in self.db.execute("SELECT DISTINCT signature_mode FROM groups WHERE signature_mode IS NOT NULL")]
+            if len(modes) == 1:
+                self.db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('signature_mode', ?)", (modes[0],))
+            # -- version 3 added the carriers index; it is filled from the runs of an older store
+            kx.CarriersIndex.provision(self.db)
+            self.db.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+
+    def find_one(self, tbl, k, v):
+        """
+        Answers a single row from the given table (tbl) where column (k) has value (v).
+        If no such row exists, I answer None.
+        """
+        c = self.execute("SELECT * FROM {} WHERE ({} = ?) LIMIT 1".format(tbl, k), (v,))
+        return c.fetchone()
+
+    def exists(self, tbl, k, v):
+        """
+        Performs a simple existence query that table (tbl) has at least one row where column (k) has value (v).
+        """
+        c = self.execute("SELECT 1 FROM {} WHERE ({} = ?) LIMIT 1".format(tbl, k), (v,))
+        return c.fetchone() is not None
+
+    # ----------------------------------------------
+    # -- Bulk writes                               |
+    # ----------------------------------------------
+    def extend(self, Nucleotides_collection, chunk=EXTEND_CHUNK):
+        """
+        Given a collection of Nucleotides instances,
+        I add any new (relative to the state of my current Nucleotides table) Nucleotides instances to my persistent collection.
+        I answer the number of Nucleotides that were new.
+        With a blob store, the new ones are those that no project has stored yet, and they go to the blob store.
+        """
+        if self.blobs is not None:
+            return self.blobs.extend(Nucleotides_collection)
+
+        # -- one row per signature, in key order (so that the b-tree is filled left to right)
+        fresh = {}
+        for nucls in Nucleotides_collection:
+            fresh.setdefault(str(nucls.signature), nucls)
+        sigs = sorted(fresh.keys())
+
+        before = self.db.total_changes
+        with self.transaction():
+            c = self.db.cursor()
+            for i in range(0, len(sigs), chunk):
+                part = sigs[i:i + chunk]
+                packed = cx.twobit_encode([fresh[sig].sequence for sig in part])
+                c.executemany("INSERT OR IGNORE INTO Nucleotides (DnaHash, packed) VALUES (?, ?)", zip(part, packed))
+        return self.db.total_changes - before
+
+    def keep(self, group):
+        """
+        I add a given instance of TOAD.RunsWithMetadata (or a GroupSnapshot) to my persistent storage,
+        replacing any earlier version of it.
+        """
+        self.keep_runs(group.GroupIdentifier, [(str(sqrl.ID), str(sqrl.signature)) for sqrl in group],
+                       group.hand(), group.signature_mode)
+
+    update = keep
+
+    def keep_runs(self, GroupIdentifier, rows, hand=(), signature_mode=None):
+        """
+        I replace the stored runs of the named group with rows, (UniqueRunID, DnaHash) text pairs,
+        and add the Nucleotides in hand, all in one transaction.
+        """
+        with self.transaction():
+            self._check_signature_mode(signature_mode)
+
+            # ------------------
+            # -- Add Nucleotides |
+            # ------------------
+            self.extend(hand)
+
+            # -------------------------
+            # -- Add one row per sqrl |
+            # -------------------------
+            gid = self._gid(GroupIdentifier, signature_mode)
+            self.execute("DELETE FROM sqrls WHERE gid = ?", (gid,))
+            self.db.executemany("INSERT INTO sqrls (gid, UniqueRunID, DnaHash) VALUES ({}, ?, ?)".format(int(gid)),
+                                sorted(rows))
+            self.carriers_index.keep(gid)
+
+    @property
+    def signature_mode(self):
+        """
+        I answer the DnaHash mode ('literal' or 'canonical') of every group in my store, or None before one is kept.
+        """
+        r = self.execute("SELECT value FROM meta WHERE key = 'signature_mode'").fetchone()
+        return None if (r is None) else r[0]
+
+    def _check_signature_mode(self, signature_mode):
+        """
+        I record signature_mode as my store's mode when the first group is kept, and raise ValueError on any other after that.
+        """
+        if signature_mode is None:
+            return
+        stored = self.signature_mode
+        if stored is None:
+            self.execute("INSERT INTO meta (key, value) VALUES ('signature_mode', ?)", (signature_mode,))
+        elif stored != signature_mode:
+            raise ValueError("cannot keep a group of {} signatures in the {} store at {}".format(
+                signature_mode, stored, self.db_path))
+
+    def _gid(self, GroupIdentifier, signature_mode=None):
+        """
+        I answer the (internal, integer) ID of the named group, adding the group if it is new.
+        """
+        name = str(GroupIdentifier)
+        self.execute("INSERT INTO groups (GroupIdentifier, signature_mode) VALUES (?, ?) "
+                     "ON CONFLICT (GroupIdentifier) DO UPDATE SET signature_mode = excluded.signature_mode",
+                     (name, signature_mode))
+        return self.execute("SELECT gid FROM groups WHERE GroupIdentifier = ?", (name,)).fetchone()['gid']
+
+    def forget(self, GroupIdentifier):
+        """
+        I drop the named group (its runs, not the Nucleotides they carry).
+        """
+        r = self.find_one('groups', 'GroupIdentifier', str(GroupIdentifier))
+        if r is not None:
+            with self.transaction():
+                self.execute("DELETE FROM sqrls WHERE gid = ?", (r['gid'],))
+                self.carriers_index.forget(r['gid'])
+                self.execute("DELETE FROM groups WHERE gid = ?", (r['gid'],))
+
+    # ----------------------------------------------
+    # -- Queries (see TOAD.db.common.Qi)           |
+    # ----------------------------------------------
+    def carriers(self, Nucleotides):
+        """
+        I answer the list of all groups that have at least one instance of the given Nucleotides (from my carriers index).
+        """
+        return self.carriers_index.carriers(Nucleotides)
+
+    def carriers_many(self, sigs):
+        """
+        I answer {DnaHash text: [GroupIdentifier, ...]} for the given signatures that are carried, looked up a chunk at a time.
+        """
+        return self.carriers_index.carriers_many(sigs)
+
+    def census(self, sig):
+        """
+        I answer {GroupIdentifier: number of runs} for the groups carrying sig.
+        """
+        return self.carriers_index.census(sig)
+
+    def census_many(self, sigs):
+        """
+        I answer {DnaHash text: {GroupIdentifier: number of runs}} for the given signatures that are carried.
+        """
+        return self.carriers_index.census_many(sigs)
+
+    def group(self, GroupIdentifier):
+        """
+        I rebuild the named group from a range scan over its runs, and a batched fetch of their Nucleotides.
+        """
+        signature_mode, sqrls = self.runs_of(GroupIdentifier)
+        group = cx.RunsWithMetadata(GroupIdentifier, signature_mode=signature_mode)
+        group.extend(sqrls, cross_check=False)
+        return group
+
+    def runs_of(self, GroupIdentifier):
+        """
+        I answer (signature_mode, [SequenceAndSignature, ...]) for the stored runs of the named group.
+        """
+        r = self.find_one('groups', 'GroupIdentifier', str(GroupIdentifier))
+        if r is None:
+            raise KeyError(str(GroupIdentifier))
+        name = cx.GroupIdentifier(r['GroupIdentifier'])
+        rows = self.execute("SELECT UniqueRunID, DnaHash FROM sqrls WHERE gid = ?", (r['gid'],)).fetchall()
+        hand = self.Nucleotides_many(set([row['DnaHash'] for row in rows]))
+        sqrls = []
+        for row in rows:
+            nucls = hand.get(row['DnaHash'])
+            s = nucls if (nucls is not None) else cx.as_DnaHash(row['DnaHash'])
+            sqrls.append(cx.SequenceAndSignature(row['UniqueRunID'], s, group=name))
+        return (r['signature_mode'], sqrls)
+
+    def SignatureAndGroupes(self, sig, groups_context=None):
+        sig = _signature_text(sig)
+        if groups_context is None:
+            c = self.execute("SELECT UniqueRunID FROM sqrls WHERE DnaHash = ?", (sig,))
+        else:
+            names = sorted(set([str(cx.GroupIdentifier(g)) for g in groups_context]))
+            c = self.execute("SELECT UniqueRunID FROM sqrls WHERE DnaHash = ? AND gid IN "
+                             "(SELECT gid FROM groups WHERE GroupIdentifier IN ({}))".format(','.join('?' * len(names))),
+                             [sig] + names)
+        return [cx.UniqueRunID(r['UniqueRunID']) for r in c]
+
+    def SequenceAndSignature(self, run):
+        """
+        I answer the stored SequenceAndSignature of the given run (the first one found, if several groups hold the run ID).
+        """
+        r = self.execute("SELECT g.GroupIdentifier, s.UniqueRunID, s.DnaHash FROM sqrls s JOIN groups g ON s.gid = g.gid "
+                         "WHERE s.UniqueRunID = ? LIMIT 1", (str(cx.UniqueRunID(run)),)).fetchone()
+        if r is None:
+            raise KeyError(str(run))
+        nucls = self.Nucleotides_many([r['DnaHash']]).get(r['DnaHash'])
+        s = nucls if (nucls is not None) else cx.as_DnaHash(r['DnaHash'])
+        return cx.SequenceAndSignature(r['UniqueRunID'], s, group=r['GroupIdentifier'])
+
+    def Nucleotides(self, sig):
+        return self.sequences[_signature_text(sig)]
+
+    def Nucleotides_many(self, sigs):
+        """
+        I answer {DnaHash text: Nucleotides} for the given signatures that I hold, looked up a chunk at a time.
+        Those not in my own file are then fetched, in one batch, from my blob store (if I have one).
+        """
+        sigs = sorted(set([_signature_text(sig) for sig in sigs]))
+        found = {}
+        for i in range(0, len(sigs), LOOKUP_CHUNK):
+            part = sigs[i:i + LOOKUP_CHUNK]
+            c = self.execute(
+                "SELECT DnaHash, packed FROM Nucleotides WHERE DnaHash IN ({})".format(','.join('?' * len(part))), part)
+            for r in c:
+                found[r['DnaHash']] = cx.Nucleotides(r['DnaHash'], r['packed'])
+        if (self.blobs is not None) and (len(found) < len(sigs)):
+            found.update(self.blobs.Nucleotides_many([sig for sig in sigs if sig not in found]))
+        return found
+
+    def __getitem__(self, oid):
+        if isinstance(oid, cx.UniqueRunID):
+            # -- look for a sqrl...
+            return self.SequenceAndSignature(oid)
+
+        if isinstance(oid, cx.GroupIdentifier):
+            # -- look for a group...
+            return self.group(oid)
+
+        if isinstance(oid, cx.DnaHash):
+            # -- look for a Nucleotides
+            return self.Nucleotides(oid)
+
+        raise ValueError(
+            "{} is not associated with any persistent object type".format(str(oid)))
+
+    def __contains__(self, oid):
+        if isinstance(oid, cx.UniqueRunID):
+            # -- look for a sqrl...
+            return self.exists("sqrls", "UniqueRunID", str(oid))
+
+        if isinstance(oid, cx.GroupIdentifier):
+            # -- look for a group...
+            return self.exists("groups", "GroupIdentifier", str(oid))
+
+        if isinstance(oid, cx.DnaHash):
+            # -- look for a Nucleotides
+            return oid in self.sequences
+
+        raise ValueError(
+            "{} is not associated with any persistent object type".format(str(oid)))
+
+
+class ReaderPool:
+    """
+    I hand out read-only (mode=ro) connections to the sqlite file at db_path, one per thread:
+    a thread keeps its connection (with its prepared statements and page cache) for as long as it lives,
+    and when it ends the connection goes back to my idle list, for the next thread, instead of being closed.
+    """
+    def __init__(self, db_path, size=READERS):
+        self.db_path = db_path
+        self.size = size
+        self.uri = 'file:{}?mode=ro'.format(pathname2url(os.path.abspath(db_path)))
+        self._local = threading.local()
+        self._idle = []
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    def _open(self):
+        db = sqlite3.connect(self.uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA query_only = ON")
+        db.execute("PRAGMA mmap_size = {}".format(int(MMAP_SIZE)))
+        db.execute("PRAGMA cache_size = -16384")  # -- 16 MiB
+        return db
+
+    def connection(self):
+        """
+        I answer the calling thread's connection, taking a warm idle one (or opening one) on its first call.
+        """
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            with self._lock:
+                db = self._idle.pop() if self._idle else None
+                if db is None:
+                    self._opened += 1
+            if db is None:
+                db = self._open()
+            holder = self._local.holder = _Held(db)
+            # -- thread local values are dropped when their thread ends; the connection then comes back to me
+            weakref.finalize(holder, self._release, db)
+        return holder.db
+
+    def _release(self, db):
+        with self._lock:
+            if (self._idle is not None) and (len(self._idle) < self.size):
+                self._idle.append(db)
+                return
+        db.close()
+
+    def close(self):
+        """
+        I close my idle connections; connections still held by live threads are closed as those threads end.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, None
+        for db in (idle or []):
+            db.close()
+        holder = getattr(self._local, 'holder', None)
+        if holder is not None:
+            del self._local.holder
+
+    @property
+    def opened(self):
+        return self._opened
+
+
+class _Held:
+    __slots__ = ('db', '__weakref__')
+
+    def __init__(self, db):
+        self.db = db
+
+
+class ReadPi(Pi):
+    """
+    I am a read-only Pi for concurrent readers (e.g. the threads of a web server):
+    every query runs on the calling thread's warm connection from a ReaderPool.
+    """
+    def __init__(self, db_path, size=READERS, blobs=None):
+        logger.debug("opening db at {} (read only)".format(db_path))
+        self.db_path = db_path
+        self.blobs = _blob_store(blobs, readonly=True)
+        self.pool = ReaderPool(db_path, size)
+        self.sequences = axsNucleotides(self)
+        self.groups = axsRunsWithMetadatas(self)
+        self.carriers_index = kx.CarriersIndex(self)
+
+    @property
+    def db(self):
+        return self.pool.connection()
+
+    def close(self):
+        self.pool.close()
+        if self.blobs is not None:
+            self.blobs.close()
+
+
+def _blob_store(blobs, readonly):
+    if (blobs is None) or isinstance(blobs, bx.BlobStore):
+        return blobs
+    return bx.BlobStore(blobs, readonly=readonly)
+
+
+def _signature_text(sig):
+    if isinstance(sig, (cx.Nucleotides, cx.SequenceAndSignature)):
+        sig = sig.signature
+    return str(sig)
+
+
+class _Transaction:
+    """
+    I am a re-entrant BEGIN ... COMMIT block: only the outermost one commits (or rolls back, on an exception).
+    """
+    def __init__(self, db):
+        self.db = db
+        self.outermost = False
+
+    def __enter__(self):
+        if not self.db.in_transaction:
+            self.db.execute("BEGIN")
+            self.outermost = True
+        return self.db
+
+    def __exit__(self, kind, value, traceback):
+        if self.outermost:
+            self.db.execute("ROLLBACK" if (kind is not None) else "COMMIT")
@@ -0,0 +1,215 @@
+import random
+import sqlite3
+import threading
+
+import pytest
+
+from toad.lib import common as cx
+from toad.DB import shards as shx
+from toad.DB import sqlite as sx
+
+SEQUENCES = ['ACGTACGTAACC', 'TTTTGGGGCCAA', 'GATTACAGATTA']
+
+
+def _group(name, canonical=False):
+    group = cx.RunsWithMetadata(name)
+    group.extend([cx.SequenceAndSignature('M1:1:FC:1:1:{}:{}'.format(i, name), cx.Nucleotides(s, canonical=canonical), group=name)
+                  for i, s in enumerate(SEQUENCES)])
+    return group
+
+
+def _random_group(name, n, seed=0):
+    rng = random.Random(seed)
+    seqs = [''.join([rng.choice('ACGT') for _ in range(40)]) for _ in range(n // 2)]
+    group = cx.RunsWithMetadata(name)
+    group.extend([cx.SequenceAndSignature('M1:1:FC:1:{}:{}:1'.format(seed, i), cx.Nucleotides(seqs[i % len(seqs)]), group=name)
+                  for i in range(n)], cross_check=False)
+    return group
+
+
+def _rows(group):
+    return sorted([(str(sqrl.ID), str(sqrl.signature), sqrl.sequence) for sqrl in group])
+
+
+def _carried(found):
+    return dict([(text, sorted(map(str, names))) for text, names in found.items()])
+
+
+def test_store_keeps_one_signature_mode(tmp_path):
+    path = str(tmp_path / 'p.db')
+    with sx.Pi(path) as pi:
+        assert pi.signature_mode is None
+        pi.keep(_group('a', canonical=True))
+        assert pi.signature_mode == 'canonical'
+        pi.keep(_group('b', canonical=True))
+        with pytest.raises(ValueError):
+            pi.keep(_group('c'))
+        # -- the refused group left nothing behind
+        assert cx.GroupIdentifier('c') not in pi
+        assert [str(name) for name in pi.groups.keys()] == ['a', 'b']
+
+    with sx.Pi(path) as pi:
+        assert pi.signature_mode == 'canonical'
+        with pytest.raises(ValueError):
+            pi.keep(_group('c'))
+        assert pi.group('a').signature_mode == 'canonical'
+
+
+@pytest.mark.parametrize('sharded', [True, False])
+def test_store_reader_serves_concurrent_threads(tmp_path, sharded):
+    groups = [_random_group(name, 40, seed=i) for i, name in enumerate(['a', 'b', 'c'])]
+    path = str(tmp_path / ('store' if sharded else 'one.db'))
+    with (shx.ShardedPi(path, shards=4) if sharded else sx.Pi(path)) as store:
+        for group in groups:
+            store.keep(group)
+
+    reader = shx.store_reader(path)
+    assert shx.store_reader(path) is reader
+    sigs = [nucls.signature for group in groups for nucls in group.hand()]
+    expected = _carried(reader.carriers_many(sigs))
+    failures = []
+
+    def read(k):
+        try:
+            for _ in range(5):
+                group = groups[k % len(groups)]
+                assert _rows(reader.group(group.GroupIdentifier)) == _rows(group)
+                assert _carried(reader.carriers_many(sigs)) == expected
+                assert len(reader.Nucleotides_many(sigs)) == len(set(map(str, sigs)))
+        except Exception as e:
+            failures.append(e)
+
+    threads = [threading.Thread(target=read, args=(k,)) for k in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+
+
+def test_reader_pool_reuses_the_connections_of_ended_threads(tmp_path):
+    path = str(tmp_path / 'p.db')
+    with sx.Pi(path) as pi:
+        pi.keep(_group('a'))
+
+    pool = sx.ReaderPool(path, size=2)
+    seen = []
+
+    def read():
+        db = pool.connection()
+        assert pool.connection() is db  # -- a thread keeps its connection
+        seen.append(db.execute("SELECT COUNT(*) FROM sqrls").fetchone()[0])
+
+    for _ in range(6):
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+    assert seen == [len(SEQUENCES)] * 6
+    assert pool.opened == 1
+
+    with pytest.raises(sqlite3.OperationalError):
+        pool.connection().execute("DELETE FROM sqrls")
+    pool.close()
+
+
+def test_read_pi_neither_writes_nor_creates(tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        sx.ReadPi(str(tmp_path / 'missing.db')).groups.keys()
+    assert not (tmp_path / 'missing.db').exists()
+
+    path = str(tmp_path / 'p.db')
+    with sx.Pi(path) as pi:
+        pi.keep(_group('a'))
+    with sx.ReadPi(path) as pi:
+        assert _rows(pi.group('a')) == _rows(_group('a'))
+        with pytest.raises(sqlite3.OperationalError):
+            pi.forget('a')
+
+
+def test_store_round_trip(tmp_path):
+    path = str(tmp_path / 'p.db')
+    a, b = _random_group('a', 60), _random_group('b', 40, seed=1)
+    with sx.Pi(path) as pi:
+        assert pi.extend(a.hand()) == len(a.hand())
+        assert pi.extend(list(a.hand()) + list(b.hand())) == len(b.hand())
+        pi.keep(a)
+        pi.keep(b)
+        assert len(pi.sequences) == len(a.hand()) + len(b.hand())
+
+    with sx.Pi(path) as pi:
+        assert _rows(pi.group('a')) == _rows(a) and _rows(pi[cx.GroupIdentifier('b')]) == _rows(b)
+        sqrl = next(iter(a))
+        assert sqrl.ID in pi and cx.GroupIdentifier('a') in pi and sqrl.signature in pi
+        assert pi[sqrl.ID].sequence == sqrl.sequence
+        assert pi.Nucleotides(sqrl.signature).sequence == sqrl.sequence
+        found = pi.Nucleotides_many([nucls.signature for nucls in a.hand()] + [cx.Nucleotides('ACGT').signature])
+        assert dict([(k, v.sequence) for k, v in found.items()]) == dict([(str(n.signature), n.sequence) for n in a.hand()])
+        with pytest.raises(KeyError):
+            pi.group('c')
+
+
+def test_store_writes_are_all_or_nothing(tmp_path):
+    with sx.Pi(str(tmp_path / 'p.db')) as pi:
+        pi.keep(_group('a'))
+        with pytest.raises(RuntimeError):
+            with pi.transaction():
+                pi.forget('a')
+                pi.extend([cx.Nucleotides('CCCCCCCCCC')])
+                raise RuntimeError()
+        assert _rows(pi.group('a')) == _rows(_group('a'))
+        assert cx.Nucleotides('CCCCCCCCCC').signature not in pi
+
+
+def test_store_with_blobs(tmp_path):
+    a = _random_group('a', 60)
+    with sx.Pi(str(tmp_path / 'p.db'), blobs=str(tmp_path / 'blobs')) as pi:
+        pi.keep(a)
+        assert len(pi.sequences) == 0  # -- only signatures in the project file
+        assert _rows(pi.group('a')) == _rows(a)
+    with sx.ReadPi(str(tmp_path / 'p.db'), blobs=str(tmp_path / 'blobs')) as pi:
+        assert _rows(pi.group('a')) == _rows(a)
+
+
+def test_store_refuses_an_unknown_version(tmp_path):
+    path = str(tmp_path / 'p.db')
+    with sx.Pi(path) as pi:
+        pi.keep(_group('a'))
+        pi.db.execute("PRAGMA user_version = 99")
+    with pytest.raises(ValueError):
+        sx.Pi(path)
+
+
+def _plan(pi, query, quargs):
+    return ' '.join([str(r[-1]) for r in pi.execute("EXPLAIN QUERY PLAN " + query, quargs)])
+
+
+def test_runs_are_stored_one_row_each(tmp_path):
+    a, b = _random_group('a', 60), _random_group('b', 40, seed=1)
+    shared = a.hand()[0]
+    b.add(cx.SequenceAndSignature('M1:1:FC:1:9:9:1', shared, group='b'), cross_check=False)
+    with sx.Pi(str(tmp_path / 'p.db')) as pi:
+        pi.keep(a)
+        pi.keep(b)
+        rows = pi.execute("SELECT g.GroupIdentifier, s.UniqueRunID, s.DnaHash FROM sqrls s JOIN groups g ON s.gid = g.gid").fetchall()
+        assert sorted([tuple(r) for r in rows]) == \
+            sorted([(str(group.GroupIdentifier), str(sqrl.ID), str(sqrl.signature)) for group in (a, b) for sqrl in group])
+
+        members = set([str(sqrl.ID) for sqrl in a if sqrl.signature == shared.signature]) | {'M1:1:FC:1:9:9:1'}
+        assert set(map(str, pi.SignatureAndGroupes(shared.signature))) == members
+        assert set(map(str, pi.SignatureAndGroupes(shared.signature, groups_context=['b']))) == {'M1:1:FC:1:9:9:1'}
+        assert pi.SequenceAndSignature(cx.UniqueRunID('M1:1:FC:1:9:9:1')).sequence == shared.sequence
+
+        # -- re-keeping a group replaces its rows; forgetting it drops them
+        pi.keep(_random_group('a', 10))
+        assert pi.execute("SELECT COUNT(*) FROM sqrls").fetchone()[0] == 10 + len(b)
+        pi.forget('a')
+        assert pi.execute("SELECT COUNT(*) FROM sqrls").fetchone()[0] == len(b)
+        assert next(iter(a)).ID not in pi and cx.UniqueRunID('M1:1:FC:1:9:9:1') in pi
+
+
+def test_run_lookups_use_the_covering_indexes(tmp_path):
+    with sx.Pi(str(tmp_path / 'p.db')) as pi:
+        pi.keep(_random_group('a', 60))
+        assert 'COVERING INDEX sqrls_runs' in _plan(pi, "SELECT 1 FROM sqrls WHERE (UniqueRunID = ?) LIMIT 1", ('x',))
+        assert 'COVERING INDEX sqrls_signatures' in _plan(pi, "SELECT UniqueRunID FROM sqrls WHERE DnaHash = ?", ('x',))
+        assert 'PRIMARY KEY' in _plan(pi, "SELECT UniqueRunID, DnaHash FROM sqrls WHERE gid = ?", (1,))
@@ -4,6 +4,7 @@ TOAD
 I am a package supporting the Tool for Organization and Analysis of DNA (TOAD).
 version = "0.1.0"
 """
+import os
 from pathlib import Path
 import sys
 
@@ -52,6 +53,9 @@ def create_app(config_class=Config, seed=None):
     '''
     app = Flask(__name__)
     app.config.from_object(config_class)
+    for key, name in (('KMER_INDEX', 'kmers.db'), ('TOAD_STORE', 'toad.db')):
+        if not app.config.get(key):
+            app.config[key] = os.path.join(app.instance_path, name)
     CORS(app, resources={r'/api/v*': {'origins': FRONTEND_URL}})
     app.after_request(after_request)
 
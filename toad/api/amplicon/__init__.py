@@ -1,11 +1,16 @@
 '''
 API for Fasta/FAA sequences
 '''
-from flask import Blueprint
+import json
+import os
+
+from flask import Blueprint, current_app, request
 
 
 from toad.api.lib.api_classes import DefaultAPI
 from toad.api.lib.utilities import register_api
+from toad.DB import shards
+from toad.lib import kmers
 from toad.lib.models import Fasta
 from .. import _API_PATH_PREFIX
 
@@ -14,7 +19,60 @@ api_amplicon = Blueprint('api_amplicons', __name__,
                          url_prefix=_API_PATH_PREFIX + '/amplicon')
 
 
+SEARCH_LIMIT = 1000  # -- hits answered by /search/ unless the request asks for fewer (or more)
+
+
 register_api(api_amplicon, DefaultAPI, Fasta,
              'fasta_api', '/fastas/', pk='id')
 # register_api(api_amplicon, DefaultAPI, Group,
 #              'group_api', '/groups/', pk='id')
+
+
+@api_amplicon.route('/search/', methods=['GET'])
+def search_motif():
+    '''
+    Sequences containing a motif (IUPAC codes allowed): GET /search/?motif=GTGCCAGCMGCCGCGGTAA[&limit=100]
+    '''
+    motif = request.args.get('motif', '')
+    if not motif:
+        return (json.dumps({"error": "motif is required"}), 400, {'ContentType': 'application/json'})
+    limit = request.args.get('limit', SEARCH_LIMIT, type=int)
+    path = current_app.config['KMER_INDEX']
+    if not os.path.exists(path):
+        return (json.dumps({"error": "no k-mer index"}), 404, {'ContentType': 'application/json'})
+    found = kmers.index_reader(path).search(motif, limit=limit)
+    hits = [{"signature": str(nucls.signature), "sequence": nucls.sequence} for nucls in found]
+    return (json.dumps({"motif": motif, "count": len(hits), "limit": limit, "hits": hits}), 200,
+            {'ContentType': 'application/json'})
+
+
+def _signatures():
+    return [sig for sig in request.args.get('signature', '').split(',') if sig]
+
+
+@api_amplicon.route('/carriers/', methods=['GET'])
+def signature_carriers():
+    '''
+    Groups carrying each signature, with their run counts: GET /carriers/?signature=<DnaHash>[,<DnaHash>...]
+    '''
+    sigs = _signatures()
+    if not sigs:
+        return (json.dumps({"error": "signature is required"}), 400, {'ContentType': 'application/json'})
+    store = shards.store_reader(current_app.config['TOAD_STORE'], current_app.config.get('TOAD_BLOBS'))
+    census = store.census_many(sigs)
+    found = dict([(sig, dict([(str(name), runs) for name, runs in census.get(sig, {}).items()])) for sig in sigs])
+    return (json.dumps({"carriers": found}), 200, {'ContentType': 'application/json'})
+
+
+@api_amplicon.route('/sequences/', methods=['GET'])
+def signature_sequences():
+    '''
+    Stored sequences, by signature: GET /sequences/?signature=<DnaHash>[,<DnaHash>...]
+    '''
+    sigs = _signatures()
+    if not sigs:
+        return (json.dumps({"error": "signature is required"}), 400, {'ContentType': 'application/json'})
+    store = shards.store_reader(current_app.config['TOAD_STORE'], current_app.config.get('TOAD_BLOBS'))
+    found = store.Nucleotides_many(sigs)
+    hits = dict([(sig, found[sig].sequence) for sig in sigs if sig in found])
+    return (json.dumps({"count": len(hits), "sequences": hits}), 200, {'ContentType': 'application/json'})
@@ -1,3 +1,4 @@
+import os
 from logging.config import dictConfig
 
 
@@ -7,6 +8,10 @@ class Config:
     MONGO2_DBNAME = 'Gatekeeper-Test'
     UPLOAD_FOLDER = 'uploads'
     TMP = 'tmp'
+    # -- unset, KMER_INDEX and TOAD_STORE default to kmers.db and toad.db in the app's instance folder (see create_app)
+    KMER_INDEX = os.environ.get('TOAD_KMER_INDEX')
+    TOAD_STORE = os.environ.get('TOAD_STORE')  # -- a sqlite store file, or a sharded store's directory
+    TOAD_BLOBS = os.environ.get('TOAD_BLOBS')  # -- the shared sequence (blob) store's directory, if TOAD_STORE keeps only signatures
     MAIL_PORT = 465
     MAIL_USE_TLS = False
     MAIL_USE_SSL = True
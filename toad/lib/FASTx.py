@@ -3,12 +3,20 @@ FASTx.py
 
 I am a library for working with FASTA and FASTQ files.
 """
+import contextlib
+import itertools
+import mmap
 import operator
 
+import numpy as np
+
 from toad.lib import common as cx
 
 
 SIGSIZE = 16
+CHUNKSIZE = 1 << 20  # -- bytes read from the underlying stream per gulp
+BATCHSIZE = 5000  # -- records per RxBatch
+PHRED_OFFSET = 33
 
 
 class RxFASTA(tuple):
@@ -47,9 +55,7 @@ class RxFASTA(tuple):
 
     @property
     def DnaHash(self):
-        if getattr(self, '_DnaHash', None) is None:
-            self._DnaHash = cx.DnaHash(self.sequence)
-        return self._DnaHash
+        return self.sequence.signature
 
 
 class RxFASTQ(tuple):
@@ -80,11 +86,11 @@ class RxFASTQ(tuple):
 
     @property
     def DnaHash(self):
-        return self.sequence.DnaHash
+        return self.sequence.signature
 
     @property
     def signature(self):
-        return self.sequence.DnaHash
+        return self.sequence.signature
 
     @property
     def instrument(self):
@@ -161,3 +167,239 @@ class RxFASTQ(tuple):
                 return cls(header, sequence, quals)
             else:
                 raise ValueError
+
+
+# ---------------------------------------------------------------
+# -- Native stanza scanners                                      |
+# -- These work on any binary stream with a .read(n) method ... |
+# -- (plain files, gzip streams, mmap objects) and answer raw   |
+# -- bytes without building any intermediate Bio objects.       |
+# ---------------------------------------------------------------
+def scan_fastq(istream, chunksize=CHUNKSIZE):
+    """
+    I yield (header, sequence, quality) triples of bytes, one per FASTQ stanza in istream.
+    The header is answered without its leading '@' (same as a Bio.SeqIO description).
+    """
+    tail = b''
+    while True:
+        block = istream.read(chunksize)
+        if not block:
+            break
+        text = tail + block
+        lines = text.split(b'\n')
+        tail = lines.pop()  # -- the (possibly incomplete) last line waits for the next block
+        # -- the carried over tail may hold a line's '\r' even when the block itself does not
+        if b'\r' in text:
+            lines = [line.rstrip(b'\r') for line in lines]
+        n = len(lines) - (len(lines) % 4)
+        if n < len(lines):
+            tail = b'\n'.join(lines[n:] + [tail])
+        yield from _fastq_stanzas(lines, n)
+
+    lines = [line.rstrip(b'\r') for line in tail.split(b'\n')]
+    while lines and not lines[-1]:
+        lines.pop()
+    if len(lines) % 4:
+        raise ValueError("truncated FASTQ stanza at end of stream")
+    yield from _fastq_stanzas(lines, len(lines))
+
+
+def _fastq_stanzas(lines, n):
+    for i in range(0, n, 4):
+        header = lines[i]
+        if not (header.startswith(b'@') and lines[i+2].startswith(b'+')):
+            raise ValueError("malformed FASTQ stanza: {!r}".format(header))
+        yield (header[1:], lines[i+1], lines[i+3])
+
+
+def scan_fasta(istream, chunksize=CHUNKSIZE):
+    """
+    I yield (header, sequence) pairs of bytes, one per FASTA entry in istream.
+    Multi-line sequences are joined; the header is answered without its leading '>'.
+    """
+    pending = b''
+    first = True
+    eof = False
+    while not eof:
+        block = istream.read(chunksize)
+        eof = not block
+        buffer = pending + block
+        if first:
+            # -- blank lines ahead of the first entry are skipped (as Bio.SeqIO does)
+            buffer = buffer.lstrip()
+            if not buffer:
+                pending = b''
+                continue
+            if not buffer.startswith(b'>'):
+                raise ValueError("malformed FASTA: stream does not start with '>'")
+            buffer = buffer[1:]
+            first = False
+        pieces = buffer.split(b'\n>')
+        pending = b'' if eof else pieces.pop()
+        for piece in pieces:
+            header, _, body = piece.partition(b'\n')
+            yield (header.rstrip(), body.replace(b'\r', b'').replace(b'\n', b''))
+
+
+def records(istream, type_, chunksize=CHUNKSIZE):
+    """
+    I yield an RxFASTQ or RxFASTA instance (depending on type_) for each entry in the binary stream istream.
+    """
+    if type_ == "fastq":
+        for header, seq, quals in scan_fastq(istream, chunksize):
+            # -- quality is stored as the list of phred scores (the shape Bio.SeqIO's phred_quality had)
+            yield RxFASTQ(header.decode(), seq.decode('ascii'), [q - PHRED_OFFSET for q in quals])
+    elif type_ == "fasta":
+        for header, seq in scan_fasta(istream, chunksize):
+            yield RxFASTA(header.decode(), seq.decode('ascii'))
+    else:
+        raise ValueError("unknown record type: {}".format(type_))
+
+
+def batches(istream, type_, size=BATCHSIZE, chunksize=CHUNKSIZE):
+    """
+    I yield RxBatch instances of (at most) size records each from the binary stream istream.
+    """
+    if type_ == "fastq":
+        stanzas = scan_fastq(istream, chunksize)
+    elif type_ == "fasta":
+        stanzas = scan_fasta(istream, chunksize)
+    else:
+        raise ValueError("unknown record type: {}".format(type_))
+
+    while True:
+        block = list(itertools.islice(stanzas, size))
+        if not block:
+            break
+        yield RxBatch.from_stanzas(type_, block)
+
+
+def _offsets(chunks):
+    """
+    I answer the int64 array of start offsets (with a trailing end offset) for chunks laid end to end.
+    """
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, chunks), dtype=np.int64, count=len(chunks)), out=offsets[1:])
+    return offsets
+
+
+class RxBatch:
+    """
+    I am a batch of N FASTA or FASTQ records held as contiguous columns ...
+    * headers - one bytes buffer, with header_offsets (N+1 int64) marking where each header starts/ends
+    * sequences - one uint8 array of ASCII bases, with offsets (N+1 int64)
+    * quals - one uint8 array of phred scores parallel to sequences (None for FASTA)
+    Per-record RxFASTQ / RxFASTA instances are only built on demand, via batch[i].
+    """
+    __slots__ = ('type_', 'headers', 'header_offsets', 'sequences', 'offsets', 'quals')
+
+    def __init__(self, type_, headers, header_offsets, sequences, offsets, quals=None):
+        self.type_ = type_
+        self.headers = headers
+        self.header_offsets = header_offsets
+        self.sequences = sequences
+        self.offsets = offsets
+        self.quals = quals
+
+    @classmethod
+    def from_stanzas(cls, type_, stanzas):
+        """
+        I build a batch from the bytes tuples answered by scan_fastq or scan_fasta.
+        """
+        columns = list(zip(*stanzas))
+        headers, seqs = columns[0], columns[1]
+        sequences = np.frombuffer(b''.join(seqs), dtype=np.uint8)
+        quals = None
+        if type_ == "fastq":
+            quals = np.frombuffer(b''.join(columns[2]), dtype=np.uint8) - PHRED_OFFSET
+            if len(quals) != len(sequences):
+                raise ValueError("FASTQ sequence and quality lengths differ")
+        return cls(type_, b''.join(headers), _offsets(headers), sequences, _offsets(seqs), quals)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if self.type_ == "fastq":
+            return RxFASTQ(self.header(i), self.sequence(i), self.quality(i))
+        return RxFASTA(self.header(i), self.sequence(i))
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def header(self, i):
+        return self.headers[self.header_offsets[i]:self.header_offsets[i+1]].decode()
+
+    def sequence_bytes(self, i):
+        return self.sequences[self.offsets[i]:self.offsets[i+1]].tobytes()
+
+    def sequence(self, i):
+        return self.sequence_bytes(i).decode('ascii')
+
+    def quality(self, i):
+        """
+        I answer the phred scores of record i, as a list of ints (the shape RxFASTQ and its mongo documents hold).
+        """
+        if self.quals is None:
+            return None
+        return self.quals[self.offsets[i]:self.offsets[i+1]].tolist()
+
+    def digests(self, canonical=False):
+        """
+        I answer the raw (N, 16) uint8 DnaHash digests of my sequences.
+        """
+        return cx.DnaHash.many(self, canonical=canonical)
+
+    def DnaHashes(self, canonical=False):
+        """
+        I answer the list of DnaHash signatures for my sequences, hashed directly from the sequence buffer.
+        """
+        return cx.DnaHash.from_digests(self.digests(canonical), canonical)
+
+    @property
+    def to_mongo(self):
+        """
+        I answer the list of mongo documents for my records (same shape as RxFASTQ.to_mongo / RxFASTA.to_mongo).
+        """
+        docs = []
+        for i, sig in enumerate(self.DnaHashes()):
+            dna = cx.Nucleotides(sig, self.sequence(i))
+            if self.type_ == "fastq":
+                docs.append({
+                    "mongo_collection": "Fastqs",
+                    "type_": "Fastq",
+                    "header": self.header(i),
+                    "dna": dna,
+                    "quality": self.quality(i)
+                })
+            else:
+                docs.append({
+                    "mongo_collection": "Fastas",
+                    "type_": "Fasta",
+                    "header": self.header(i),
+                    "dna": dna,
+                })
+        return docs
+
+
+@contextlib.contextmanager
+def mapped(path):
+    """
+    I open the (uncompressed) file at path as a read-only mmap.
+    Empty files cannot be mapped, so for those I answer the plain binary file object instead.
+    """
+    with open(path, 'rb') as fin:
+        try:
+            mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield fin
+            return
+        try:
+            yield mm
+        finally:
+            mm.close()
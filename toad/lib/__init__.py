@@ -68,15 +68,16 @@ class Toad(clix.App):
         Vomit reads docline
         '''
         # python toad_test.py vomit reads seq: sequence
+        # python toad_test.py vomit reads motif: GTGCCAGCMGCCGCGGTAA kmer_index: ~/kmers.db
         filter_args = {}
-        for value in self.conf['filter']:
+        for value in self.conf.get('filter', []):
             if self.mode == 'debug':
                 print(f'Running through {value}')
             k, v = value[0], value[1]
             filter_args[k] = v
         if self.mode == 'debug':
             print(f'filter_args={filter_args}')
-        mx.MongoQuery(**filter_args)
+        mx.MongoQuery(motif=self.conf.get('motif'), kmer_index=self.conf.get('kmer_index'), **filter_args)
         self.succeeded(msg="Good job, success")
         return 0
 
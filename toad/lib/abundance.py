@@ -0,0 +1,237 @@
+"""
+abundance.py
+
+I build the sample-by-signature counts table that downstream analyses start from:
+a sparse (CSR) matrix with one row per group and one column per distinct DnaHash signature,
+where each cell is the number of runs of that group carrying that signature.
+
+Groups are streamed in (as RunsWithMetadata, or straight from saved JSON snapshots without building them),
+rows are packed into CSR pieces every few groups, and the finished matrix saves to an uncompressed .npz
+whose arrays can be memory-mapped back, in place.
+"""
+import json
+import zipfile
+
+import numpy as np
+
+from toad.lib import common as cx
+
+
+CHUNK_ROWS = 256  # -- groups gathered before their rows are packed into a CSR piece
+
+
+class AbundanceMatrix:
+    """
+    I am a groups x signatures counts matrix in CSR form:
+    the counts of row i are data[indptr[i]:indptr[i+1]], in the columns indices[indptr[i]:indptr[i+1]].
+    rows holds the group names; columns holds the raw (N, 16) digests of the signatures (see DnaHash.from_digests).
+    """
+    def __init__(self, indptr, indices, data, rows, columns, canonical=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.rows = rows
+        self.columns = columns
+        self.canonical = canonical
+
+    @property
+    def shape(self):
+        return (len(self.indptr) - 1, len(self.columns))
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def row_index(self):
+        """
+        I answer {group name: row}.
+        """
+        return dict([(str(name), i) for i, name in enumerate(self.rows)])
+
+    def column_index(self):
+        """
+        I answer {DnaHash: column}.
+        """
+        return dict([(sig, j) for j, sig in enumerate(self.DnaHashes())])
+
+    def DnaHashes(self):
+        return cx.DnaHash.from_digests(np.asarray(self.columns), self.canonical)
+
+    def row(self, i):
+        """
+        I answer (columns, counts) of the non-zero cells in row i.
+        """
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return (self.indices[lo:hi], self.data[lo:hi])
+
+    def _owners(self):
+        """
+        I answer the row of each stored count.
+        """
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def row_sums(self):
+        return np.bincount(self._owners(), weights=self.data, minlength=self.shape[0]).astype(np.int64)
+
+    def column_sums(self):
+        return np.bincount(self.indices, weights=self.data, minlength=self.shape[1]).astype(np.int64)
+
+    def to_dense(self):
+        dense = np.zeros(self.shape, dtype=self.data.dtype)
+        dense[self._owners(), self.indices] = self.data
+        return dense
+
+    def save_as(self, dst):
+        """
+        I write myself to dst as an uncompressed .npz (so that loaded_from can memory-map my arrays).
+        """
+        np.savez(dst, indptr=self.indptr, indices=self.indices, data=self.data,
+                 rows=np.asarray(self.rows, dtype=str), columns=np.asarray(self.columns, dtype=np.uint8),
+                 canonical=np.array(-1 if self.canonical is None else int(self.canonical)))
+
+    @classmethod
+    def loaded_from(cls, src, mmap=True):
+        """
+        I load a matrix written by save_as; with mmap, the numeric arrays are memory-mapped rather than read.
+        """
+        arrays = _npz_memmap(src) if mmap else {}
+        with np.load(src) as npz:
+            for name in npz.files:
+                if name not in arrays:
+                    arrays[name] = npz[name]
+        canonical = int(arrays['canonical'])
+        return cls(arrays['indptr'], arrays['indices'], arrays['data'], arrays['rows'], arrays['columns'],
+                   None if canonical < 0 else bool(canonical))
+
+
+def _npz_memmap(src):
+    """
+    I answer {name: read-only np.memmap} for the uncompressed, fixed width arrays stored in the .npz at src.
+    """
+    arrays = {}
+    with zipfile.ZipFile(src) as zf, open(src, 'rb') as fin:
+        for info in zf.infolist():
+            if (info.compress_type != zipfile.ZIP_STORED) or not info.filename.endswith('.npy'):
+                continue
+            # -- the member's data follows its local file header (30 bytes + name + extra field)
+            fin.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(fin.read(4), dtype='<u2')
+            fin.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            version = np.lib.format.read_magic(fin)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(fin)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(fin)
+            if dtype.hasobject or (len(shape) == 0) or (0 in shape):
+                continue
+            arrays[info.filename[:-4]] = np.memmap(src, dtype=dtype, mode='r', offset=fin.tell(), shape=shape,
+                                                   order='F' if fortran else 'C')
+    return arrays
+
+
+class AbundanceBuilder:
+    """
+    I assemble an AbundanceMatrix one group at a time.
+    Columns are numbered in order of first appearance, so groups can be streamed in without knowing all signatures up front.
+    """
+    def __init__(self, chunk_rows=CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self._columns = {}  # -- {signature text: column}
+        self._rows = []
+        self._pieces = []  # -- packed (indices, data) pieces, plus their row lengths
+        self._pending = []
+        self.canonical = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add_counts(self, name, counts):
+        """
+        I add a row named name from counts, a mapping of {signature: number of runs}.
+        """
+        columns = self._columns
+        cols = np.empty(len(counts), dtype=np.int64)
+        vals = np.empty(len(counts), dtype=np.int32)
+        for i, (sig, n) in enumerate(counts.items()):
+            sig = str(sig)
+            j = columns.get(sig)
+            if j is None:
+                j = columns[sig] = len(columns)
+                self._check_mode(sig)
+            cols[i] = j
+            vals[i] = n
+        order = np.argsort(cols, kind='stable')
+        self._rows.append(str(name))
+        self._pending.append((cols[order], vals[order]))
+        if len(self._pending) >= self.chunk_rows:
+            self._pack()
+
+    def _check_mode(self, sig):
+        canonical = sig.startswith(cx.DnaHash.CANONICAL_MARK)
+        if self.canonical is None:
+            self.canonical = canonical
+        elif self.canonical != canonical:
+            raise ValueError("cannot mix literal and canonical DnaHash signatures")
+
+    def add_group(self, group):
+        """
+        I add a row for a RunsWithMetadata group.
+        """
+        self.add_counts(group.RDN, dict([(sig, len(sag)) for sig, sag in group._SignatureAndGroupes.items()]))
+
+    def add_snapshot(self, src_path):
+        """
+        I add a row for a group saved as JSON (see RunsWithMetadata.save_as), without building the group.
+        """
+        with open(src_path, 'rt') as istream:
+            jdn = json.load(istream)
+        if 'SignatureAndGroupes' in jdn:
+            counts = dict([(sig, len(members)) for sig, members in jdn['SignatureAndGroupes'].items()])
+        else:
+            counts = {}
+            for packet in jdn['sqrls'].values():
+                counts[packet[0]] = counts.get(packet[0], 0) + 1
+        self.add_counts(jdn['RDN'], counts)
+
+    def _pack(self):
+        if self._pending:
+            lengths = np.array([len(cols) for cols, vals in self._pending], dtype=np.int64)
+            self._pieces.append((np.concatenate([cols for cols, vals in self._pending]),
+                                 np.concatenate([vals for cols, vals in self._pending]), lengths))
+            self._pending = []
+
+    def build(self):
+        """
+        I answer the AbundanceMatrix of every row added so far.
+        """
+        self._pack()
+        lengths = np.concatenate([[0]] + [piece[2] for piece in self._pieces])
+        indices = np.concatenate([np.empty(0, dtype=np.int64)] + [piece[0] for piece in self._pieces])
+        data = np.concatenate([np.empty(0, dtype=np.int32)] + [piece[1] for piece in self._pieces])
+        # -- pack everything into one piece, so that a later build doesn't redo the concatenation
+        self._pieces = [(indices, data, lengths[1:])]
+
+        sigs = list(self._columns.keys())
+        columns = cx._b85decode([sig.lstrip(cx.DnaHash.CANONICAL_MARK) for sig in sigs]) if sigs \
+            else np.empty((0, cx.SIGSIZE), dtype=np.uint8)
+        return AbundanceMatrix(np.cumsum(lengths), indices, data, list(self._rows), columns, self.canonical)
+
+
+def from_groups(groups, chunk_rows=CHUNK_ROWS):
+    """
+    I answer the AbundanceMatrix of an iterable of RunsWithMetadata (e.g. a generator over a store).
+    """
+    builder = AbundanceBuilder(chunk_rows)
+    for group in groups:
+        builder.add_group(group)
+    return builder.build()
+
+
+def from_snapshots(paths, chunk_rows=CHUNK_ROWS):
+    """
+    I answer the AbundanceMatrix of the groups saved (as JSON) at the given paths.
+    """
+    builder = AbundanceBuilder(chunk_rows)
+    for path in paths:
+        builder.add_snapshot(path)
+    return builder.build()
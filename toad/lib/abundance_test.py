@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+import pytest
+
+from toad.lib import abundance as ax
+from toad.lib import common as cx
+
+
+def _groups(n, seed=0, canonical=False):
+    rng = random.Random(seed)
+    pool = [''.join([rng.choice('ACGT') for _ in range(30)]) for _ in range(50)]
+    groups = []
+    for g in range(n):
+        name = 'sample{}'.format(g)
+        group = cx.RunsWithMetadata(name)
+        group.extend([cx.SequenceAndSignature('M1:1:FC:1:{}:{}:1'.format(g, i), cx.Nucleotides(rng.choice(pool[:10 + 4 * g]), canonical=canonical),
+                                              group=name) for i in range(rng.randrange(1, 80))], cross_check=False)
+        groups.append(group)
+    return groups
+
+
+def _expected(groups):
+    return [dict([(str(sig), len(sag)) for sig, sag in group._SignatureAndGroupes.items()]) for group in groups]
+
+
+def _cells(matrix):
+    sigs = [str(sig) for sig in matrix.DnaHashes()]
+    dense = matrix.to_dense()
+    return [dict([(sigs[j], int(dense[i, j])) for j in np.nonzero(dense[i])[0]]) for i in range(matrix.shape[0])]
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 3, ax.CHUNK_ROWS])
+def test_matrix_holds_the_run_counts(chunk_rows):
+    groups = _groups(10)
+    matrix = ax.from_groups(groups, chunk_rows=chunk_rows)
+    assert matrix.shape == (10, len(set().union(*[group.SignatureAndGroupes for group in groups])))
+    assert _cells(matrix) == _expected(groups)
+    assert matrix.row_sums().tolist() == [len(group) for group in groups]
+    assert matrix.column_sums().sum() == sum([len(group) for group in groups])
+    assert matrix.row_index()['sample3'] == 3
+    cols, counts = matrix.row(0)
+    assert list(cols) == sorted(cols) and counts.sum() == len(groups[0])
+
+
+def test_matrix_from_snapshots_matches_groups(tmp_path):
+    groups = _groups(6)
+    paths = []
+    for i, group in enumerate(groups):
+        paths.append(str(tmp_path / '{}.json'.format(group.RDN)))
+        group.save_as(paths[-1], *(('-SignatureAndGroupes',) if i % 2 else ()))
+    assert _cells(ax.from_snapshots(paths)) == _cells(ax.from_groups(groups))
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_matrix_save_and_load(tmp_path, mmap):
+    matrix = ax.from_groups(_groups(5, canonical=True))
+    path = str(tmp_path / 'counts.npz')
+    matrix.save_as(path)
+    loaded = ax.AbundanceMatrix.loaded_from(path, mmap=mmap)
+    assert isinstance(loaded.data, np.memmap) == mmap
+    assert loaded.canonical is True and loaded.shape == matrix.shape
+    assert _cells(loaded) == _cells(matrix)
+    assert [str(name) for name in loaded.rows] == matrix.rows
+
+
+def test_matrix_keeps_one_mode():
+    builder = ax.AbundanceBuilder()
+    builder.add_group(_groups(1)[0])
+    with pytest.raises(ValueError):
+        builder.add_group(_groups(1, canonical=True)[0])
+    assert ax.from_groups([]).shape == (0, 0)
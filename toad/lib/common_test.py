@@ -0,0 +1,498 @@
+import pytest
+
+from toad.lib.common import (DnaHash, GroupSnapshot, Nucleotides, RunsWithMetadata, SequenceAndSignature,
+                             UniqueRunID, canonical as canonical_form)
+
+SEQUENCES = ['ACGTACGTAA', 'ACGTACGTAA', 'TTTTGGGGCC', 'GATTACAGAT']
+
+
+def _group(name='g', canonical=False):
+    group = RunsWithMetadata(name)
+    group.extend([SequenceAndSignature('M1:1:FC:1:1:{}:1'.format(i), Nucleotides(s, canonical=canonical), group=name)
+                  for i, s in enumerate(SEQUENCES)])
+    return group
+
+
+def _rows(group):
+    return sorted([(str(sqrl.ID), str(sqrl.signature), sqrl.sequence) for sqrl in group])
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    group = _group()
+    path = str(tmp_path / 'g.toadsnap')
+    group.save_as(path)
+    with RunsWithMetadata.loaded_from(path) as snap:
+        yield group, snap
+
+
+def test_snapshot_round_trip(snapshot):
+    group, snap = snapshot
+
+    assert isinstance(snap, GroupSnapshot)
+    assert len(snap) == len(group)
+    assert _rows(snap) == _rows(group)
+    assert set(snap.runs()) == set(group.runs())
+    assert sorted([str(nucls.sequence) for nucls in snap.hand()]) == sorted(set(SEQUENCES))
+    assert _rows(snap.materialized()) == _rows(group)
+
+
+def test_snapshot_membership(snapshot):
+    group, snap = snapshot
+
+    for sqrl in group:
+        assert sqrl.ID in snap
+        assert sqrl in snap
+        assert sqrl.signature in snap
+    assert UniqueRunID('M1:1:FC:1:1:99:1') not in snap
+    assert Nucleotides('CCCCCCCCCC') not in snap
+
+
+def test_snapshot_signature_lookup_takes_any_signature_holder(snapshot):
+    group, snap = snapshot
+    nucls = Nucleotides(SEQUENCES[0])
+    sqrl = next(iter(group))
+
+    expected = set(group.SignatureAndRunsWithMetadata(nucls.signature).members)
+    assert len(expected) == 2
+    for key in (nucls.signature, nucls, SequenceAndSignature('M1:1:FC:1:1:0:1', nucls, group='g')):
+        found = snap.SignatureAndRunsWithMetadata(key)
+        assert found.signature == nucls.signature
+        assert set(found.members) == expected
+    assert sqrl.ID in snap.SignatureAndRunsWithMetadata(sqrl).members
+    assert len(snap.SignatureAndRunsWithMetadata(Nucleotides('CCCCCCCCCC'))) == 0
+
+
+def test_snapshot_of_canonical_group(tmp_path):
+    group = _group(canonical=True)
+    path = str(tmp_path / 'g.toadsnap')
+    group.save_as(path)
+
+    with RunsWithMetadata.loaded_from(path) as snap:
+        assert snap.signature_mode == 'canonical'
+        assert _rows(snap) == _rows(group)
+        assert Nucleotides(SEQUENCES[2], canonical=True).signature in snap
+        assert Nucleotides(SEQUENCES[2]).signature not in snap
+        assert Nucleotides('GGCCCCAAAA', canonical=True) in snap  # -- the reverse complement of SEQUENCES[2]
+
+
+def _sqrls(name, start, n, distinct=1000):
+    return [SequenceAndSignature('M1:1:FC:1:1:{}:1'.format(i), Nucleotides(SEQUENCES[i % 4] + 'ACGT'[(i // 4) % 4] * ((i % distinct) // 16 + 1)),
+                                 group=name) for i in range(start, start + n)]
+
+
+@pytest.mark.parametrize('backend', [None, 'bitmap'])
+def test_group_views_after_interleaved_extends(backend):
+    group = RunsWithMetadata('g', runs_backend=backend)
+    seen = []
+    for chunk in range(5):
+        fresh = _sqrls('g', 10 * chunk, 10)
+        group.extend(fresh)
+        seen.extend(fresh)
+        runs, hand, sigs, roster = group.runs(), group.hand(), group.SignatureAndGroupes, group.RunsRoster
+
+        assert runs == frozenset([sqrl.ID for sqrl in seen])
+        assert sigs == frozenset([sqrl.signature for sqrl in seen])
+        assert set(hand) == set([Nucleotides(sqrl.signature, sqrl.sequence) for sqrl in seen])
+        assert len(hand) == len(sigs)
+        assert (hand[0] in hand) and (hand[-1] == tuple(hand)[-1])
+        assert hash(runs) == hash(frozenset(runs)) and hash(hand) == hash(tuple(hand))
+        assert set(roster) == set(runs) and roster.frozen
+
+    # -- views (and rosters) handed out earlier do not change when the group grows
+    group.extend(_sqrls('g', 1000, 3, distinct=1))
+    assert len(runs) == len(roster) == 50
+    assert UniqueRunID('M1:1:FC:1:1:1000:1') not in runs
+    assert UniqueRunID('M1:1:FC:1:1:1000:1') not in roster
+    assert UniqueRunID('M1:1:FC:1:1:1000:1') in group.runs()
+    assert len(group.RunsRoster) == 53
+    with pytest.raises(AttributeError):
+        roster.add('M1:1:FC:1:1:2000:1')
+
+
+def test_group_views_cost_the_new_runs_only():
+    import time
+    group = RunsWithMetadata('g')
+    group.extend(_sqrls('g', 0, 100000))
+
+    began = time.perf_counter()
+    for chunk in range(300):
+        fresh = _sqrls('g', 100000 + 10 * chunk, 10)
+        group.extend(fresh)
+        assert fresh[-1].ID in group.runs()
+        assert fresh[-1].signature in group.SignatureAndGroupes
+        assert len(group.hand()) > 0
+        assert fresh[-1].ID in group.RunsRoster
+    # -- rebuilding the views from scratch after every chunk takes seconds here
+    assert time.perf_counter() - began < 1.0
+
+
+def _reads(n, length, seed=0):
+    import random
+    rng = random.Random(seed)
+    return [''.join([rng.choice('ACGTN') for _ in range(rng.randrange(length // 2, length))]) for _ in range(n)]
+
+
+@pytest.mark.parametrize('canonical', [False, True])
+@pytest.mark.parametrize('length, threads', [(150, None), (150, 1), (3000, 2)])
+def test_many_digests_match_shakeup(monkeypatch, canonical, length, threads):
+    from toad.lib import common as cx
+    monkeypatch.setattr(cx, 'HASH_SLICE', 16)  # -- so that the long reads go through the thread pool
+    reads = _reads(100, length) + ['', 'A', 'acgtn']
+    digests = DnaHash.many(reads, threads=threads, canonical=canonical)
+    assert digests.shape == (len(reads), 16)
+    expected = [str(DnaHash(read, canonical=canonical)) for read in reads]
+    assert list(map(str, DnaHash.from_digests(digests, canonical=canonical))) == expected
+    if not canonical:
+        assert expected == [DnaHash.shakeup(read) for read in reads]
+    else:
+        assert expected == [DnaHash.CANONICAL_MARK + DnaHash.shakeup(canonical_form(read)) for read in reads]
+
+
+def test_hash_pools_are_kept_per_size():
+    from toad.lib import common as cx
+    assert cx._hash_pool(2) is cx._hash_pool(2)
+    assert cx._hash_pool(3) is not cx._hash_pool(2)
+    assert cx._hash_pool(3)._max_workers == 3
+
+
+def test_pool_interns_and_evicts_the_least_recently_used():
+    from toad.lib.common import NucleotidesPool
+    pool = NucleotidesPool(maxsize=2)
+    first = pool.intern(Nucleotides(SEQUENCES[0]))
+    assert pool.intern(Nucleotides(SEQUENCES[1])) is first  # -- same sequence, one instance
+    sqrl = SequenceAndSignature('M1:1:FC:1:1:9:1', Nucleotides(SEQUENCES[0]), group='g', pool=pool)
+    assert sqrl.sequence is first.sequence
+
+    second = pool.intern(Nucleotides(SEQUENCES[2]))
+    pool.intern(Nucleotides(SEQUENCES[0]))  # -- SEQUENCES[0] is now the most recently used
+    pool.intern(Nucleotides(SEQUENCES[3]))
+    assert len(pool) == 2
+    assert first.signature in pool and second.signature not in pool
+    assert first.sequence == SEQUENCES[0]  # -- evicting an entry leaves its users alone
+
+    assert pool.intern(Nucleotides(SEQUENCES[2], canonical=True)).signature not in pool
+    pool.resize(1)
+    assert len(pool) == 1 and Nucleotides(SEQUENCES[3]).signature in pool
+
+
+def _signature_sets(seed=0):
+    import random
+    rng = random.Random(seed)
+    reads = [''.join([rng.choice('ACGT') for _ in range(rng.randrange(20, 60))]) for _ in range(3000)]
+    a = set([str(DnaHash(read)) for read in reads[:2000]])
+    b = set([str(DnaHash(read)) for read in reads[1000:]])
+    return a, b, reads
+
+
+def test_signature_array_set_algebra():
+    import numpy as np
+    from toad.lib.common import SignatureArray
+    a, b, reads = _signature_sets()
+    A, B = SignatureArray(a), SignatureArray(sorted(b, reverse=True) + list(b)[:10])  # -- duplicates collapse
+    assert len(A) == len(a) and len(B) == len(b)
+    assert SignatureArray(DnaHash.many(reads[:2000]), canonical=False) == A
+
+    assert set(map(str, A | B)) == a | b
+    assert set(map(str, A & B)) == a & b
+    assert set(map(str, A - B)) == a - b
+    assert set(map(str, B - A)) == b - a
+    assert list(map(str, A | B)) == list(map(str, SignatureArray(a | b)))  # -- kept in digest order
+    assert (A | SignatureArray()) == A and len(A & SignatureArray()) == 0
+
+    probe = sorted(b)
+    assert A.isin(SignatureArray(probe)).tolist() == [sig in a for sig in sorted(probe, key=lambda sig: DnaHash(shakeup=sig).raw)]
+    assert all([DnaHash(shakeup=sig) in A for sig in list(a)[:50]])
+    assert Nucleotides(reads[2500]) not in A
+
+    # -- signatures sharing their first 8 bytes sort (and are found) on the last 8
+    digests = np.zeros((6, 16), dtype=np.uint8)
+    digests[:, 15] = [5, 1, 3, 9, 7, 2]
+    C = SignatureArray(digests[:4])
+    D = SignatureArray(digests[2:])
+    assert C.digests[:, 15].tolist() == [1, 3, 5, 9]
+    assert (C & D).digests[:, 15].tolist() == [3, 9]
+    assert (C | D).digests[:, 15].tolist() == [1, 2, 3, 5, 7, 9]
+    assert (C - D).digests[:, 15].tolist() == [1, 5]
+
+
+def test_signature_array_keeps_one_mode():
+    from toad.lib.common import SignatureArray
+    literal = SignatureArray([Nucleotides(s) for s in SEQUENCES])
+    canonical = SignatureArray([Nucleotides(s, canonical=True) for s in SEQUENCES])
+    assert canonical.canonical and not literal.canonical
+    assert all([str(sig).startswith(DnaHash.CANONICAL_MARK) for sig in canonical])
+    with pytest.raises(ValueError):
+        literal | canonical
+    with pytest.raises(ValueError):
+        SignatureArray([Nucleotides(SEQUENCES[0]), Nucleotides(SEQUENCES[2], canonical=True)])
+    assert set(map(str, _group(canonical=True).SignatureArray)) == set(map(str, canonical))
+    assert set(map(str, _group().SignatureArray)) == set(map(str, _group().SignatureAndGroupes))
+
+
+def _twobit_sequences():
+    import random
+    rng = random.Random(3)
+    seqs = ['', 'A', 'ACG', 'ACGT', 'ACGTA', 'N', 'NNNNNNNN', 'acgt', 'ACGTNNRYKMacgtSWBDHVU', 'AAAAN', 'NAAAA']
+    for _ in range(200):
+        seqs.append(''.join([rng.choice('ACGT' * 8 + 'NRYacgtn-') for _ in range(rng.randrange(0, 300))]))
+    return seqs
+
+
+def test_twobit_round_trip():
+    from toad.lib.common import twobit_decode, twobit_encode
+    seqs = _twobit_sequences()
+    blobs = twobit_encode(seqs)
+    assert all([blob.startswith(b'P') for blob in blobs])
+    assert twobit_decode(blobs) == seqs
+    assert twobit_encode([seq.encode('ascii') for seq in seqs]) == blobs
+    assert twobit_decode([]) == []
+    # -- plain ACGT costs 2 bits a base
+    assert len(twobit_encode(['ACGT' * 100])[0]) < 120
+
+    for seq, blob in zip(seqs, blobs):
+        nucls = Nucleotides(Nucleotides(seq).signature, blob)
+        assert nucls.length == len(seq)
+        assert nucls.sequence == seq
+        assert nucls.packed == blob == Nucleotides(seq).packed
+
+
+def test_twobit_slices():
+    import random
+    from toad.lib.common import twobit_encode, twobit_slice
+    rng = random.Random(4)
+    for seq, blob in zip(_twobit_sequences(), twobit_encode(_twobit_sequences())):
+        nucls = Nucleotides(Nucleotides(seq).signature, blob)
+        bounds = [(0, len(seq)), (0, 0), (-3, None), (None, 5), (len(seq), len(seq) + 10), (5, 2)]
+        bounds += [(rng.randrange(-10, len(seq) + 10), rng.randrange(-10, len(seq) + 10)) for _ in range(5)]
+        for start, stop in bounds:
+            assert twobit_slice(blob, start, stop) == seq[start:stop]
+            assert nucls.subsequence(start, stop) == seq[start:stop]
+
+
+def _amplicon_group(name='g', variants=60, runs=3, seed=5):
+    import random
+    rng = random.Random(seed)
+    base = ''.join([rng.choice('ACGT') for _ in range(250)])
+    seqs = []
+    for _ in range(variants):
+        seq = list(base)
+        for _ in range(rng.randrange(0, 4)):
+            seq[rng.randrange(len(seq))] = rng.choice('ACGT')
+        seqs.append(''.join(seq))
+    group = RunsWithMetadata(name)
+    group.extend([SequenceAndSignature('M1:1:FC:1:{}:{}:1'.format(i, j), Nucleotides(seq), group=name)
+                  for i, seq in enumerate(seqs) for j in range(runs)], cross_check=False)
+    return group
+
+
+def test_sequence_dictionary_round_trip(tmp_path):
+    import json
+    from toad.lib.common import SequenceDictionary
+    group = _amplicon_group()
+    zdict = group.SequenceDictionary()
+    for nucls in group.hand():
+        assert zdict.decompress(zdict.compress(nucls.sequence)) == nucls.sequence
+    packed = sum([len(zdict.compress(nucls.sequence)) for nucls in group.hand()])
+    gzipped = sum([len(nucls.gzsequence) for nucls in group.hand()])
+    assert packed * 3 < gzipped
+
+    restored = SequenceDictionary.fromJDN(zdict.toJDN())
+    assert restored.RDN == zdict.RDN and restored.zdict == zdict.zdict
+    broken = zdict.toJDN()
+    broken['RDN'] = '00000000'
+    with pytest.raises(ValueError):
+        SequenceDictionary.fromJDN(broken)
+
+    for kwargs in ({'compression': 'zdict'}, {'zdict': _amplicon_group(seed=6).SequenceDictionary()}):
+        path = str(tmp_path / 'g.json')
+        group.save_as(path, **kwargs)
+        with open(path) as istream:
+            jdn = json.load(istream)
+        assert 'SequenceDictionary' in jdn and all([len(packet) == 1 for packet in jdn['sqrls'].values()])
+        assert _rows(RunsWithMetadata.loaded_from(path)) == _rows(group)
+
+
+def _overlapping_groups(shared, only, seed=7):
+    import random
+    rng = random.Random(seed)
+    reads = [''.join([rng.choice('ACGT') for _ in range(40)]) for _ in range(shared + 2 * only)]
+    groups = []
+    for name, chosen in (('a', reads[:shared + only]), ('b', reads[:shared] + reads[shared + only:])):
+        group = RunsWithMetadata(name)
+        group.extend([SequenceAndSignature('M1:1:FC:1:1:{}:1'.format(i), Nucleotides(seq), group=name)
+                      for i, seq in enumerate(chosen)], cross_check=False)
+        groups.append(group)
+    return groups
+
+
+def test_minhash_estimates(tmp_path):
+    import numpy as np
+    from toad.lib.common import MinHashSketch, sketch_matrix
+    a, b = _overlapping_groups(shared=6000, only=3000)  # -- Jaccard 6000 / 12000, containment 6000 / 9000
+    assert a.MinHashSketch.jaccard(b.MinHashSketch) == pytest.approx(0.5, abs=0.06)
+    assert a.MinHashSketch.containment(b.MinHashSketch) == pytest.approx(2 / 3, abs=0.06)
+
+    jaccard, containment = sketch_matrix([a, b, a])
+    assert np.allclose(jaccard, jaccard.T) and np.allclose(np.diag(jaccard), 1.0)
+    assert jaccard[0, 2] == 1.0 and containment[0, 2] == 1.0
+    assert len(a.MinHashSketch) == len(a.SignatureAndGroupes)
+
+    # -- a sketch kept up to date as the group grows equals one made from scratch
+    first = a.MinHashSketch
+    a.extend([SequenceAndSignature('M1:1:FC:1:2:{}:1'.format(i), Nucleotides(SEQUENCES[i]), group='a') for i in range(4)])
+    assert np.array_equal(a.MinHashSketch.bins, MinHashSketch.of(a.SignatureAndGroupes).bins)
+    assert len(first) == 9000 and len(a.MinHashSketch) == 9003
+
+    with pytest.raises(ValueError):
+        sketch_matrix([MinHashSketch.of(a.SignatureAndGroupes, bins=64), b.MinHashSketch])
+    with pytest.raises(ValueError):
+        MinHashSketch.of(a.SignatureAndGroupes, bins=100)
+
+
+def test_minhash_is_saved_with_its_group(tmp_path):
+    import json
+    import numpy as np
+    from toad.lib.common import MinHashSketch
+    group = _group()
+    group.save_as(str(tmp_path / 'plain.json'))
+    with open(str(tmp_path / 'plain.json')) as istream:
+        assert 'MinHashSketch' not in json.load(istream)
+    with pytest.raises(ValueError):
+        MinHashSketch.loaded_from(str(tmp_path / 'plain.json'))
+
+    for args in (('+MinHashSketch',), ()):
+        path = str(tmp_path / 'g{}.json'.format(len(args)))
+        group.save_as(path, *args)  # -- once computed, the sketch is kept in later saves too
+        sketch = MinHashSketch.loaded_from(path)
+        assert np.array_equal(sketch.bins, group.MinHashSketch.bins) and len(sketch) == len(group.SignatureAndGroupes)
+        assert np.array_equal(RunsWithMetadata.loaded_from(path).MinHashSketch.bins, sketch.bins)
+
+
+def test_runs_bitmap_set_algebra():
+    import random
+    import numpy as np
+    from toad.lib.common import RunsBitmap, RunsDictionary
+    rng = random.Random(8)
+    dictionary = RunsDictionary()
+    runs = [UniqueRunID('M1:1:FC:1:1:{}:1'.format(i)) for i in range(140000)]
+    dictionary.numbers(runs)
+    # -- a dense first container (held as a bitmap), sparse ones after it (held as arrays)
+    a = set(rng.sample(range(65536), 9000)) | set(rng.sample(range(65536, 140000), 3000))
+    b = set(rng.sample(range(65536), 5000)) | set(rng.sample(range(65536, 140000), 5000)) | set(list(a)[:500])
+    A = RunsBitmap(dictionary, [runs[n] for n in a])
+    B = RunsBitmap(dictionary, [runs[n] for n in b])
+    assert A.containers[0].dtype == np.uint64 and A.containers[1].dtype == np.uint16
+
+    for found, expected in ((A | B, a | b), (A & B, a & b), (A - B, a - b), (B - A, b - a)):
+        assert found.numbers().tolist() == sorted(expected)
+        assert len(found) == len(expected)
+    assert list(A) == [runs[n] for n in sorted(a)]
+    assert all([(runs[n] in A) == (n in a) for n in rng.sample(range(140000), 2000)])
+    assert len(A - A) == 0 and (A & RunsBitmap(dictionary)).containers == {}
+
+    # -- an intersection that thins a bitmap container out is held as an array again
+    thin = A & RunsBitmap(dictionary, [runs[n] for n in sorted(a)[:10]])
+    assert thin.containers[0].dtype == np.uint16 and len(thin) == 10
+
+    # -- foreign runs are numbered in a copy of the dictionary
+    stranger = UniqueRunID('M1:1:FC:1:2:1:1')
+    joined = A | set([stranger])
+    assert stranger in joined and stranger not in A
+    assert len(dictionary) == 140000 and dictionary.get(stranger) is None
+    assert len(A & set([stranger, runs[sorted(a)[0]]])) == 1
+
+
+def test_bitmap_backend_answers_as_sets():
+    plain, bitmap = _amplicon_group(), RunsWithMetadata('g', runs_backend='bitmap')
+    bitmap.extend(list(plain), cross_check=False)
+    assert set(bitmap.RunsRoster) == set(plain.RunsRoster)
+    for sig in plain.SignatureAndGroupes:
+        assert set(bitmap.SignatureAndRunsWithMetadata(sig).members) == set(plain.SignatureAndRunsWithMetadata(sig).members)
+    sigs = list(plain.SignatureAndGroupes)
+    one = bitmap.SignatureAndRunsWithMetadata(sigs[0])
+    two = bitmap.SignatureAndRunsWithMetadata(sigs[1])
+    assert set(one | two) == set(one.members) | set(two.members)
+    assert len(one & two) == 0 and set(one - two) == set(one.members)
+    with pytest.raises(AttributeError):
+        one.add('M1:1:FC:1:9:9:9')
+
+
+@pytest.mark.parametrize('suffix', ['.ndjson', '.ndjson.gz'])
+def test_ndjson_round_trip(tmp_path, suffix):
+    import numpy as np
+    from toad.lib.common import NucleotidesPool
+    group = _amplicon_group()
+    group.MinHashSketch
+    for args, kwargs in (((), {}), (('-SignatureAndGroupes',), {'compression': 'zdict'})):
+        path = str(tmp_path / ('g' + suffix))
+        group.save_as(path, *args, **kwargs)
+        for chunk in (7, 100000):
+            streamed = RunsWithMetadata.streamed_from(path, chunk=chunk)
+            assert _rows(streamed) == _rows(group)
+            assert streamed.SignatureAndGroupes == group.SignatureAndGroupes
+            assert np.array_equal(streamed.MinHashSketch.bins, group.MinHashSketch.bins)
+        assert _rows(RunsWithMetadata.loaded_from(path)) == _rows(group)
+
+    pool = NucleotidesPool()
+    pooled = RunsWithMetadata.loaded_from(path, pool=pool)
+    assert len(pool) == len(group.hand())
+    assert all([sqrl.sequence is pool.get(sqrl.signature).sequence for sqrl in pooled])
+
+
+def test_ndjson_of_canonical_and_signature_only_groups(tmp_path):
+    canonical = _group(canonical=True)
+    canonical.save_as(str(tmp_path / 'c.ndjson'))
+    streamed = RunsWithMetadata.loaded_from(str(tmp_path / 'c.ndjson'))
+    assert streamed.signature_mode == 'canonical' and _rows(streamed) == _rows(canonical)
+
+    group = _group()
+    group.save_as(str(tmp_path / 's.ndjson'), '-Nucleotides')
+    streamed = RunsWithMetadata.loaded_from(str(tmp_path / 's.ndjson'))
+    assert set(streamed.runs()) == set(group.runs())
+    assert all([sqrl.sequence is None for sqrl in streamed])
+
+    with open(str(tmp_path / 'r.ndjson'), 'wt') as ostream:
+        ostream.write('{"_type": "TOAD.RunsRoster", "RDN": "g"}\n')
+    with pytest.raises(ValueError):
+        RunsWithMetadata.loaded_from(str(tmp_path / 'r.ndjson'))
+
+
+def _collections(group):
+    from toad.lib.common import RunsRoster
+    sags = [group.SignatureAndRunsWithMetadata(sig) for sig in group.SignatureAndGroupes]
+    rosters = [group.RunsRoster, RunsRoster('h', ['M1:1:FC:1:1:1:1', 'M1:1:FC:1:1:2:1']), RunsRoster('empty', [])]
+    return sags, rosters
+
+
+def _sorted_members(jdns):
+    """
+    I answer jdns with their members lists sorted (a roster's members come back in set order).
+    """
+    return [dict([(k, sorted(v) if (k == 'members') else v) for k, v in jdn.items()]) for jdn in jdns]
+
+
+@pytest.mark.parametrize('backend', [None, 'bitmap'])
+def test_bulk_jdn_equals_one_at_a_time(backend):
+    from toad.lib.common import MinHashSketch, RunsRoster, SignatureAndGroup
+    group = RunsWithMetadata('g', runs_backend=backend)
+    group.extend(list(_amplicon_group()), cross_check=False)
+    sags, rosters = _collections(group)
+    sketches = [group.MinHashSketch, MinHashSketch.of(_group().SignatureAndGroupes)]
+
+    for cls, objs in ((SignatureAndGroup, sags), (RunsRoster, rosters), (MinHashSketch, sketches),
+                      (RunsWithMetadata, [group, _group('h')])):
+        jdns = cls.toJDNs(objs)
+        assert jdns == [obj.toJDN() for obj in objs]
+        rebuilt = cls.fromJDNs(jdns)
+        assert _sorted_members([obj.toJDN() for obj in rebuilt]) == _sorted_members([cls.fromJDN(jdn).toJDN() for jdn in jdns])
+        assert [type(obj) for obj in rebuilt] == [cls] * len(objs)
+    assert RunsWithMetadata.toJDNs([group], '-SignatureAndGroupes') == [group.toJDN('-SignatureAndGroupes')]
+
+    for one, many in zip([SignatureAndGroup.fromJDN(jdn) for jdn in SignatureAndGroup.toJDNs(sags)],
+                         SignatureAndGroup.fromJDNs(SignatureAndGroup.toJDNs(sags))):
+        assert (one.signature, one.group, one.frozen) == (many.signature, many.group, many.frozen)
+        assert set(one) == set(many) and type(one.signature) is type(many.signature)
+    assert SignatureAndGroup.toJDNs([]) == [] and SignatureAndGroup.fromJDNs([]) == []
+    with pytest.raises(ValueError):
+        SignatureAndGroup.fromJDNs(RunsRoster.toJDNs(rosters))
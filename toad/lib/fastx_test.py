@@ -1,3 +1,138 @@
-import gzip
+import io
+import random
 
-file = "toad/tests/064997_1_S126_R1_filtered.fastq.gz"
+import pytest
+from Bio import SeqIO
+
+from toad.lib import FASTx as fx
+from toad.lib import common as cx
+
+CHUNKSIZES = [1, 7, 64, fx.CHUNKSIZE]
+
+
+def _fastq(n, seed=0):
+    rng = random.Random(seed)
+    stanzas = []
+    for i in range(n):
+        seq = ''.join([rng.choice('ACGTN') for _ in range(rng.randrange(1, 120))])
+        quals = ''.join([chr(33 + rng.randrange(41)) for _ in seq])
+        stanzas.append(('M1:1:FC:1:1:{}:1 1:N:0:{}'.format(i, i % 7), seq, quals))
+    return stanzas
+
+
+def _fastq_text(stanzas, newline='\n'):
+    return ''.join(['@{}{nl}{}{nl}+{nl}{}{nl}'.format(header, seq, quals, nl=newline)
+                    for header, seq, quals in stanzas]).encode('ascii')
+
+
+def _fasta(n, seed=0):
+    rng = random.Random(seed)
+    return [('seq{} sample={}'.format(i, i % 3), ''.join([rng.choice('ACGTacgtN') for _ in range(rng.randrange(0, 200))]))
+            for i in range(n)]
+
+
+def _fasta_text(entries, newline='\n', width=60):
+    text = ''
+    for header, seq in entries:
+        lines = [seq[i:i + width] for i in range(0, len(seq), width)]
+        text += '>' + header + newline + ''.join([line + newline for line in lines])
+    return text.encode('ascii')
+
+
+def _scanned(scan, data, chunksize):
+    return [tuple([field.decode('ascii') for field in stanza]) for stanza in scan(io.BytesIO(data), chunksize)]
+
+
+@pytest.mark.parametrize('chunksize', CHUNKSIZES)
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_scan_fastq(chunksize, newline):
+    stanzas = _fastq(50)
+    data = _fastq_text(stanzas, newline)
+    assert _scanned(fx.scan_fastq, data, chunksize) == stanzas
+    assert _scanned(fx.scan_fastq, data + newline.encode() * 3, chunksize) == stanzas  # -- trailing blank lines
+    assert _scanned(fx.scan_fastq, data.rstrip(), chunksize) == stanzas  # -- no final newline
+
+
+def test_scan_fastq_matches_seqio():
+    data = _fastq_text(_fastq(50))
+    expected = [(r.description, str(r.seq), r.letter_annotations['phred_quality'])
+                for r in SeqIO.parse(io.StringIO(data.decode('ascii')), 'fastq')]
+    assert [(r.header, r.sequence.sequence, r.quality) for r in fx.records(io.BytesIO(data), 'fastq')] == expected
+
+
+@pytest.mark.parametrize('chunksize', CHUNKSIZES)
+def test_scan_fastq_refuses_truncated_and_malformed_input(chunksize):
+    data = _fastq_text(_fastq(5))
+    lines = data.split(b'\n')
+    for cut in (1, 2, 3):
+        with pytest.raises(ValueError):
+            list(fx.scan_fastq(io.BytesIO(b'\n'.join(lines[:-1 - cut])), chunksize))
+    with pytest.raises(ValueError):
+        list(fx.scan_fastq(io.BytesIO(data.replace(b'\n+\n', b'\n-\n', 1)), chunksize))
+    with pytest.raises(ValueError):
+        list(fx.scan_fastq(io.BytesIO(b'\n' + data), chunksize))
+    assert list(fx.scan_fastq(io.BytesIO(b''), chunksize)) == []
+
+
+@pytest.mark.parametrize('chunksize', CHUNKSIZES)
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_scan_fasta(chunksize, newline):
+    entries = _fasta(40) + [('empty', '')]
+    data = _fasta_text(entries, newline)
+    assert _scanned(fx.scan_fasta, data, chunksize) == entries
+    # -- blank lines ahead of the first entry are skipped, as Bio.SeqIO does
+    assert _scanned(fx.scan_fasta, newline.encode() * 2 + data, chunksize) == entries
+    assert _scanned(fx.scan_fasta, _fasta_text(entries, newline, width=7), chunksize) == entries
+    assert _scanned(fx.scan_fasta, data.rstrip(), chunksize) == entries
+
+
+def test_scan_fasta_matches_seqio():
+    data = _fasta_text(_fasta(40), width=13)
+    expected = [(r.description, str(r.seq)) for r in SeqIO.parse(io.StringIO(data.decode('ascii')), 'fasta')]
+    assert [(r.header, r.sequence.sequence) for r in fx.records(io.BytesIO(data), 'fasta')] == expected
+
+
+def test_scan_fasta_refuses_input_without_a_header():
+    with pytest.raises(ValueError):
+        list(fx.scan_fasta(io.BytesIO(b'ACGT\n>a\nACGT\n')))
+    assert list(fx.scan_fasta(io.BytesIO(b''))) == []
+    assert list(fx.scan_fasta(io.BytesIO(b'\n\n'))) == []
+
+
+@pytest.mark.parametrize('size', [1, 7, 50, 1000])
+def test_fastq_batches_hold_the_records(size):
+    stanzas = _fastq(50)
+    data = _fastq_text(stanzas)
+    batches = list(fx.batches(io.BytesIO(data), 'fastq', size=size, chunksize=64))
+    assert [len(batch) for batch in batches] == [min(size, 50 - i) for i in range(0, 50, size)]
+
+    records = list(fx.records(io.BytesIO(data), 'fastq'))
+    rows = [record for batch in batches for record in batch]
+    assert rows == records
+    assert [doc for batch in batches for doc in batch.to_mongo] == [record.to_mongo for record in records]
+
+    batch = batches[0]
+    assert batch.lengths.tolist() == [len(seq) for header, seq, quals in stanzas[:size]]
+    assert batch.DnaHashes() == [record.signature for record in records[:size]]
+    assert batch.DnaHashes(canonical=True) == [cx.Nucleotides(seq, canonical=True).signature
+                                                for header, seq, quals in stanzas[:size]]
+    assert batch.sequence_bytes(0) == stanzas[0][1].encode('ascii')
+
+
+def test_fasta_batches_hold_the_records():
+    entries = _fasta(30)
+    data = _fasta_text(entries)
+    batches = list(fx.batches(io.BytesIO(data), 'fasta', size=8))
+    assert [len(batch) for batch in batches] == [8, 8, 8, 6]
+    assert all([batch.quals is None for batch in batches])
+    rows = [(batch.header(i), batch.sequence(i)) for batch in batches for i in range(len(batch))]
+    assert rows == entries
+    assert [doc['dna'] for batch in batches for doc in batch.to_mongo] == \
+        [record.sequence for record in fx.records(io.BytesIO(data), 'fasta')]
+
+
+def test_batch_refuses_unequal_sequence_and_quality():
+    with pytest.raises(ValueError):
+        fx.RxBatch.from_stanzas('fastq', [(b'M1:1:FC:1:1:1:1', b'ACGT', b'III')])
+    with pytest.raises(ValueError):
+        list(fx.batches(io.BytesIO(b''), 'fastx'))
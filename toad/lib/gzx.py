@@ -0,0 +1,226 @@
+"""
+gzx.py
+
+I am a library for reading gzip compressed sequence files quickly.
+I answer binary, file-like streams that can be handed straight to the FASTx scanners.
+
+* BGZF files (blocked gzip, as written by bgzip / samtools) carry the size of every block in its header,
+  so I inflate whole runs of blocks in a thread pool (zlib releases the GIL while it inflates).
+* Any other gzip file (single or multi-member) is inflated by a background read-ahead thread,
+  so that decompression overlaps with parsing on the consumer's side.
+"""
+import collections
+import os
+import queue
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+CHUNKSIZE = 1 << 20  # -- compressed bytes read per gulp by the read-ahead thread
+READAHEAD = 8  # -- number of inflated chunks the read-ahead thread may queue up
+BLOCKS_PER_JOB = 64  # -- BGZF blocks (<= 64 KiB each) inflated per thread pool job
+
+BGZF_MAGIC = b'\x1f\x8b\x08\x04'
+
+
+def is_bgzf(path):
+    """
+    I answer True if the file at path starts with a BGZF block header.
+    """
+    with open(path, 'rb') as fin:
+        head = fin.read(18)
+    return (len(head) == 18) and head.startswith(BGZF_MAGIC) and (head[12:14] == b'BC')
+
+
+def open_gzip(path, threads=None, chunksize=CHUNKSIZE):
+    """
+    I answer a GzStream of the inflated contents of the gzip file at path.
+    threads is the size of the BGZF thread pool (default: all cores).
+    """
+    if is_bgzf(path):
+        threads = threads or os.cpu_count() or 1
+        return GzStream(_bgzf_chunks(path, threads))
+    return GzStream(_readahead_chunks(path, chunksize))
+
+
+class GzStream:
+    """
+    I am a read-only binary stream over an iterator of inflated byte chunks.
+    """
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buf = b''
+        self._pos = 0
+        self.closed = False
+
+    def read(self, n=-1):
+        if (n is None) or (n < 0):
+            data = b''.join([self._buf[self._pos:]] + list(self._chunks))
+            self._buf, self._pos = b'', 0
+            return data
+
+        if len(self._buf) - self._pos >= n:
+            data = self._buf[self._pos:self._pos + n]
+            self._pos += n
+            return data
+
+        pieces = [self._buf[self._pos:]]
+        have = len(pieces[0])
+        while have < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            pieces.append(chunk)
+            have += len(chunk)
+
+        data = b''.join(pieces)
+        if len(data) > n:
+            self._buf, self._pos = data, n
+            return data[:n]
+        self._buf, self._pos = b'', 0
+        return data
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._chunks.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ----------------------------------------------
+# -- BGZF: block-parallel inflation            |
+# ----------------------------------------------
+def _bgzf_blocks(fin):
+    """
+    I yield (deflate data, crc32, inflated size) for each BGZF block in the binary file fin.
+    """
+    while True:
+        head = fin.read(12)
+        if not head:
+            return
+        if (len(head) < 12) or not head.startswith(BGZF_MAGIC):
+            raise ValueError("not a BGZF block at offset {}".format(fin.tell() - len(head)))
+        xlen = int.from_bytes(head[10:12], 'little')
+        extra = fin.read(xlen)
+
+        bsize = None
+        i = 0
+        while i + 4 <= len(extra):
+            slen = int.from_bytes(extra[i+2:i+4], 'little')
+            if (extra[i:i+2] == b'BC') and (slen == 2):
+                bsize = int.from_bytes(extra[i+4:i+6], 'little')
+            i += 4 + slen
+        if bsize is None:
+            raise ValueError("BGZF block without a BSIZE field")
+
+        # -- total block size is bsize + 1 == 12 (header) + xlen + len(cdata) + 8 (trailer)
+        rest = fin.read(bsize - xlen - 11)
+        if len(rest) != bsize - xlen - 11:
+            raise EOFError("BGZF file ended in the middle of a block")
+        crc, isize = struct.unpack('<II', rest[-8:])
+        yield (rest[:-8], crc, isize)
+
+
+def _inflate_blocks(blocks):
+    inflated = []
+    for cdata, crc, isize in blocks:
+        data = zlib.decompress(cdata, -15)
+        if (len(data) != isize) or (zlib.crc32(data) != crc):
+            raise ValueError("BGZF block failed its size/CRC check")
+        inflated.append(data)
+    return b''.join(inflated)
+
+
+def _bgzf_chunks(path, threads):
+    with open(path, 'rb') as fin, ThreadPoolExecutor(threads) as pool:
+        inflight = collections.deque()
+        job = []
+        for block in _bgzf_blocks(fin):
+            job.append(block)
+            if len(job) == BLOCKS_PER_JOB:
+                inflight.append(pool.submit(_inflate_blocks, job))
+                job = []
+                # -- keep a bounded number of jobs in flight, so memory stays flat
+                if len(inflight) >= 2 * threads:
+                    yield inflight.popleft().result()
+        if job:
+            inflight.append(pool.submit(_inflate_blocks, job))
+        while inflight:
+            yield inflight.popleft().result()
+
+
+# ----------------------------------------------
+# -- Plain / multi-member gzip: read-ahead     |
+# ----------------------------------------------
+def _readahead_chunks(path, chunksize, depth=READAHEAD):
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def pump():
+        try:
+            for chunk in _inflate_members(path, chunksize):
+                if stop.is_set():
+                    return
+                put(chunk)
+        except BaseException as e:
+            put(e)
+        finally:
+            put(None)
+
+    worker = threading.Thread(target=pump, name="gzx-readahead", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+
+def _inflate_members(path, chunksize):
+    """
+    I yield the inflated contents of every gzip member in the file at path, in order.
+    Zero padding between members is skipped, as the gzip module does.
+    """
+    with open(path, 'rb') as fin:
+        inflater = None
+        while True:
+            raw = fin.read(chunksize)
+            if not raw:
+                break
+            while raw:
+                if inflater is None:
+                    raw = raw.lstrip(b'\x00')
+                    if not raw:
+                        break
+                    inflater = zlib.decompressobj(31)
+                data = inflater.decompress(raw)
+                if data:
+                    yield data
+                if inflater.eof:
+                    raw = inflater.unused_data
+                    inflater = None
+                else:
+                    raw = b''
+        if inflater is not None:
+            raise EOFError("compressed file ended before the end-of-stream marker was reached")
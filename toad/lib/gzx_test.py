@@ -0,0 +1,96 @@
+import gzip
+import random
+import zlib
+
+import pytest
+from Bio import bgzf
+
+from toad.lib import gzx
+
+
+def _payload(n=200000, seed=0):
+    rng = random.Random(seed)
+    return ''.join([rng.choice('ACGT\n') for _ in range(n)]).encode('ascii')
+
+
+def _bgzf(path, data):
+    with bgzf.BgzfWriter(str(path), 'wb') as ostream:
+        ostream.write(data)
+    return str(path)
+
+
+def _read(stream, size):
+    pieces = []
+    with stream:
+        while True:
+            piece = stream.read(size)
+            if not piece:
+                return b''.join(pieces)
+            pieces.append(piece)
+
+
+@pytest.mark.parametrize('threads', [1, 3])
+def test_bgzf_round_trip(tmp_path, monkeypatch, threads):
+    monkeypatch.setattr(gzx, 'BLOCKS_PER_JOB', 2)  # -- many jobs in flight, finishing out of order
+    data = _payload()
+    path = _bgzf(tmp_path / 'reads.fastq.gz', data)
+    assert gzx.is_bgzf(path)
+    assert _read(gzx.open_gzip(path, threads=threads), 4099) == data
+    assert gzx.open_gzip(path, threads=threads).read() == data
+
+
+def test_gzip_members_round_trip(tmp_path):
+    data = _payload()
+    single = str(tmp_path / 'single.gz')
+    with gzip.open(single, 'wb') as ostream:
+        ostream.write(data)
+    multi = str(tmp_path / 'multi.gz')
+    with open(multi, 'wb') as ostream:
+        for i in range(0, len(data), 30000):
+            ostream.write(gzip.compress(data[i:i + 30000]))
+        ostream.write(b'\x00' * 10)  # -- padding after the last member, which gzip skips too
+    assert gzip.open(multi).read() == data
+
+    for path in (single, multi):
+        assert not gzx.is_bgzf(path)
+        assert _read(gzx.open_gzip(path, chunksize=1000), 777) == data
+        assert gzx.open_gzip(path).read() == data
+
+
+def test_bgzf_block_failing_its_crc(tmp_path):
+    path = _bgzf(tmp_path / 'reads.fastq.gz', _payload(50000))
+    with open(path, 'rb') as fin:
+        raw = bytearray(fin.read())
+    bsize = int.from_bytes(raw[16:18], 'little')
+    raw[bsize + 1 - 8] ^= 0xff  # -- the first block's CRC32
+    with open(path, 'wb') as ostream:
+        ostream.write(raw)
+    with pytest.raises(ValueError):
+        gzx.open_gzip(path, threads=2).read()
+
+
+def test_gzip_member_failing_its_crc(tmp_path):
+    raw = bytearray(gzip.compress(_payload(50000)))
+    raw[-8] ^= 0xff
+    path = str(tmp_path / 'reads.fastq.gz')
+    with open(path, 'wb') as ostream:
+        ostream.write(raw)
+    with pytest.raises(zlib.error):
+        gzx.open_gzip(path).read()
+
+
+def test_truncated_files(tmp_path):
+    data = _payload(100000)
+    plain = bytes(gzip.compress(data))
+    with open(str(tmp_path / 'plain.gz'), 'wb') as ostream:
+        ostream.write(plain[:len(plain) // 2])
+    with pytest.raises(EOFError):
+        gzx.open_gzip(str(tmp_path / 'plain.gz')).read()
+
+    path = _bgzf(tmp_path / 'blocked.gz', data)
+    with open(path, 'rb') as fin:
+        raw = fin.read()
+    with open(path, 'wb') as ostream:
+        ostream.write(raw[:len(raw) // 2])
+    with pytest.raises(EOFError):
+        gzx.open_gzip(path).read()
@@ -0,0 +1,265 @@
+"""
+kmers.py
+
+I am a persistent k-mer inverted index over stored Nucleotides.
+I map every k-mer (2 bits per base, packed into an integer) to the signatures of the sequences that contain it,
+so that reads containing a motif or primer can be found without scanning every stored sequence:
+the posting lists of the motif's k-mers are intersected for candidates, and the candidates are then verified.
+
+The index is a single sqlite file, extended incrementally (e.g. batch by batch during ingest).
+Readers (e.g. the API's request handlers) share one read-only index per file, see index_reader.
+"""
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+from toad.lib import common as cx
+from toad.DB import sqlite as sx
+
+
+KMER_SIZE = 12  # -- default k; fixed when an index file is created
+LOOKUP_CHUNK = 500  # -- host parameters per "IN (...)" query
+
+_CODES = np.full(256, 255, dtype=np.uint8)
+_CODES[np.frombuffer(b'ACGT', dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+_CODES[np.frombuffer(b'acgt', dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+
+_IUPAC = {
+    'A': 'A', 'C': 'C', 'G': 'G', 'T': 'T', 'U': 'T',
+    'R': '[AG]', 'Y': '[CT]', 'S': '[CG]', 'W': '[AT]', 'K': '[GT]', 'M': '[AC]',
+    'B': '[CGT]', 'D': '[AGT]', 'H': '[ACT]', 'V': '[ACG]', 'N': '.',
+}
+
+
+def kmers_of(bases, k):
+    """
+    Given a uint8 array of ASCII bases, I answer (starts, kmers) for every window of k ACGT bases.
+    Windows that touch any other byte (N, IUPAC codes, separators ...) are skipped.
+    """
+    n = len(bases) - k + 1
+    if n <= 0:
+        return (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64))
+    codes = _CODES[bases]
+    bad = np.concatenate([[0], np.cumsum(codes == 255)])
+    ok = (bad[k:] - bad[:n]) == 0
+    codes = np.where(codes == 255, 0, codes).astype(np.uint64)
+
+    values = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        values = (values << np.uint64(2)) | codes[j:j + n]
+    starts = np.nonzero(ok)[0]
+    return (starts, values[starts])
+
+
+def motif_pattern(motif):
+    """
+    I answer a compiled regex for a motif, honouring IUPAC ambiguity codes.
+    """
+    return re.compile(''.join([_IUPAC.get(base, re.escape(base)) for base in motif.upper()]))
+
+
+class KmerIndex:
+    """
+    I am a k-mer -> signatures inverted index, persisted in a sqlite file at path.
+    I also keep each indexed sequence (2 bit packed), to verify candidates.
+    Given readonly=True, I neither create nor change the file: every query runs on the calling thread's
+    read-only (mode=ro) connection from a sqlite.ReaderPool.
+    """
+    def __init__(self, path, k=None, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self.pool = sx.ReaderPool(path)
+            self._db = None
+            r = self.db.execute("SELECT value FROM meta WHERE key = 'k'").fetchone()
+            if r is None:
+                raise ValueError("{} is not a k-mer index".format(path))
+            self.k = int(r[0])
+            if (k is not None) and (k != self.k):
+                raise ValueError("k-mer index at {} was built with k={}, not k={}".format(self.path, self.k, k))
+        else:
+            self.pool = None
+            self._db = sqlite3.connect(path)
+            self.provision(k)
+
+    @property
+    def db(self):
+        return self._db if (self.pool is None) else self.pool.connection()
+
+    def provision(self, k):
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sequences (sid INTEGER PRIMARY KEY, DnaHash TEXT UNIQUE, packed BLOB)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS postings (kmer INTEGER, sid INTEGER, PRIMARY KEY (kmer, sid)) WITHOUT ROWID")
+
+        r = self.db.execute("SELECT value FROM meta WHERE key = 'k'").fetchone()
+        if r is None:
+            self.k = k or KMER_SIZE
+            self.db.execute("INSERT INTO meta (key, value) VALUES ('k', ?)", (str(self.k),))
+            self.db.commit()
+        else:
+            self.k = int(r[0])
+            if (k is not None) and (k != self.k):
+                raise ValueError("k-mer index at {} was built with k={}, not k={}".format(self.path, self.k, k))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+        else:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM sequences").fetchone()[0]
+
+    def __contains__(self, sig):
+        sig = sig.signature if isinstance(sig, cx.Nucleotides) else sig
+        return self.db.execute("SELECT 1 FROM sequences WHERE DnaHash = ?", (str(sig),)).fetchone() is not None
+
+    def _known(self, sigs):
+        known = set()
+        for i in range(0, len(sigs), LOOKUP_CHUNK):
+            chunk = sigs[i:i + LOOKUP_CHUNK]
+            c = self.db.execute(
+                "SELECT DnaHash FROM sequences WHERE DnaHash IN ({})".format(','.join('?' * len(chunk))), chunk)
+            known.update([r[0] for r in c])
+        return known
+
+    def extend(self, hand):
+        """
+        Given a collection of Nucleotides, I index the ones I have not seen before.
+        I answer the number of newly indexed sequences.
+        """
+        if self.readonly:
+            raise ValueError("k-mer index at {} is open read only".format(self.path))
+        fresh = {}
+        for nucls in hand:
+            fresh.setdefault(str(nucls.signature), nucls)
+        known = self._known(list(fresh.keys()))
+        fresh = [nucls for sig, nucls in fresh.items() if sig not in known]
+        if not fresh:
+            return 0
+
+        seqs = [nucls.sequence for nucls in fresh]
+        with self.db:
+            c = self.db.cursor()
+            sids = []
+            for nucls, packed in zip(fresh, cx.twobit_encode(seqs)):
+                c.execute("INSERT INTO sequences (DnaHash, packed) VALUES (?, ?)", (str(nucls.signature), packed))
+                sids.append(c.lastrowid)
+
+            # -- k-mers of the whole batch at once; a newline between sequences stops windows crossing them
+            chunks = [seq.encode('ascii') for seq in seqs]
+            bases = np.frombuffer(b'\n'.join(chunks), dtype=np.uint8)
+            bounds = np.cumsum([len(chunk) + 1 for chunk in chunks])
+            starts, values = kmers_of(bases, self.k)
+            owners = np.asarray(sids, dtype=np.int64)[np.searchsorted(bounds, starts, 'right')]
+            # -- sorted, unique (kmer, sid) pairs go into the b-tree in key order, which is far cheaper than at random
+            values = values.astype(np.int64)
+            order = np.lexsort((owners, values))
+            values, owners = values[order], owners[order]
+            keep = np.ones(len(order), dtype=bool)
+            keep[1:] = (values[1:] != values[:-1]) | (owners[1:] != owners[:-1])
+            c.executemany("INSERT OR IGNORE INTO postings (kmer, sid) VALUES (?, ?)",
+                          zip(values[keep].tolist(), owners[keep].tolist()))
+        return len(fresh)
+
+    def _posting(self, kmer):
+        return set([r[0] for r in self.db.execute("SELECT sid FROM postings WHERE kmer = ?", (int(kmer),))])
+
+    def candidates(self, motif):
+        """
+        I answer the set of sequence ids whose posting lists cover the k-mers of motif ...
+        or None, if motif has no run of k plain bases to look up (every sequence is then a candidate).
+        """
+        motif = motif.upper()
+        bases = np.frombuffer(motif.encode('ascii'), dtype=np.uint8)
+        starts, values = kmers_of(bases, self.k)
+        if len(starts) == 0:
+            return None
+
+        # -- a tiling of the motif by (mostly) non-overlapping k-mers is as selective as all of them
+        tiles, last = [], -self.k
+        for start, value in zip(starts.tolist(), values.tolist()):
+            if start >= last + self.k:
+                tiles.append(value)
+                last = start
+        tiles.append(int(values[-1]))
+
+        found = None
+        for kmer in sorted(set(tiles), key=lambda kmer: self._posting_size(kmer)):
+            posting = self._posting(kmer)
+            found = posting if (found is None) else (found & posting)
+            if not found:
+                break
+        return found
+
+    def _posting_size(self, kmer):
+        return self.db.execute("SELECT COUNT(*) FROM postings WHERE kmer = ?", (int(kmer),)).fetchone()[0]
+
+    def _sequences(self, sids):
+        """
+        I yield lists of (signature, packed sequence) for the given sequence ids (or for all, if sids is None).
+        """
+        if sids is None:
+            c = self.db.execute("SELECT DnaHash, packed FROM sequences")
+            while True:
+                rows = c.fetchmany(LOOKUP_CHUNK)
+                if not rows:
+                    return
+                yield rows
+        sids = sorted(sids)
+        for i in range(0, len(sids), LOOKUP_CHUNK):
+            chunk = sids[i:i + LOOKUP_CHUNK]
+            yield self.db.execute(
+                "SELECT DnaHash, packed FROM sequences WHERE sid IN ({})".format(','.join('?' * len(chunk))),
+                chunk).fetchall()
+
+    def search(self, motif, limit=None):
+        """
+        I answer the list of indexed Nucleotides that contain motif (IUPAC codes allowed) ...
+        at most limit of them, if limit is given (candidates are then verified only until limit are found).
+        """
+        pattern = motif_pattern(motif)
+        found = []
+        if (limit is not None) and (limit <= 0):
+            return found
+        for rows in self._sequences(self.candidates(motif)):
+            for (sig, packed), seq in zip(rows, cx.twobit_decode([packed for sig, packed in rows])):
+                if pattern.search(seq.upper()):
+                    found.append(cx.Nucleotides(sig, seq))
+                    if len(found) == limit:
+                        return found
+        return found
+
+    def signatures(self, motif, limit=None):
+        """
+        I answer the list of DnaHash signatures of the indexed sequences that contain motif (at most limit of them).
+        """
+        return [nucls.signature for nucls in self.search(motif, limit)]
+
+
+_READERS = {}
+_READERS_LOCK = threading.Lock()
+
+
+def index_reader(path):
+    """
+    I answer a shared, read-only KmerIndex for the file at path, opened once per process,
+    so that e.g. every request handler of the API reuses the same warm connections.
+    """
+    path = os.path.abspath(path)
+    with _READERS_LOCK:
+        reader = _READERS.get(path)
+        if reader is None:
+            reader = _READERS[path] = KmerIndex(path, readonly=True)
+    return reader
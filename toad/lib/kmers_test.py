@@ -0,0 +1,66 @@
+import random
+import sqlite3
+
+import pytest
+
+from toad.lib import common as cx
+from toad.lib import kmers
+
+MOTIF = 'GTGCCAGCMGCCGCGGTAA'
+
+
+def _hand(n, seed=0):
+    rng = random.Random(seed)
+    hand = []
+    for i in range(n):
+        seq = ''.join([rng.choice('ACGT') for _ in range(80)])
+        if i % 3 == 0:
+            at = rng.randrange(60)
+            seq = seq[:at] + MOTIF.replace('M', 'AC'[i % 2]) + seq[at + 19:]
+        hand.append(cx.Nucleotides(seq[:80]))
+    return hand
+
+
+def _scanned(hand, motif):
+    pattern = kmers.motif_pattern(motif)
+    return sorted(set([str(nucls.signature) for nucls in hand if pattern.search(nucls.sequence)]))
+
+
+def test_search_matches_a_scan(tmp_path):
+    hand = _hand(300)
+    with kmers.KmerIndex(str(tmp_path / 'kmers.db')) as index:
+        assert index.extend(hand[:200]) == 200
+        assert index.extend(hand) == 100
+        assert len(index) == 300 and hand[0] in index
+        for motif in (MOTIF, 'GTGCCAGCAGCC', 'NNNNGCGGTAA', hand[5].sequence[10:40]):
+            assert sorted(map(str, index.signatures(motif))) == _scanned(hand, motif)
+
+
+def test_search_limit(tmp_path):
+    hand = _hand(300)
+    expected = _scanned(hand, MOTIF)
+    with kmers.KmerIndex(str(tmp_path / 'kmers.db')) as index:
+        index.extend(hand)
+        limited = index.search(MOTIF, limit=5)
+        assert len(limited) == 5 and set([str(nucls.signature) for nucls in limited]) <= set(expected)
+        assert len(index.search(MOTIF, limit=len(expected) + 10)) == len(expected)
+        assert index.search(MOTIF, limit=0) == []
+
+
+def test_read_only_index(tmp_path):
+    path = str(tmp_path / 'kmers.db')
+    with pytest.raises(sqlite3.OperationalError):
+        kmers.KmerIndex(str(tmp_path / 'missing.db'), readonly=True)
+    assert not (tmp_path / 'missing.db').exists()
+
+    hand = _hand(60)
+    with kmers.KmerIndex(path, k=10) as index:
+        index.extend(hand)
+    reader = kmers.index_reader(path)
+    assert kmers.index_reader(path) is reader
+    assert reader.k == 10
+    assert sorted(map(str, reader.signatures(MOTIF))) == _scanned(hand, MOTIF)
+    with pytest.raises(ValueError):
+        reader.extend(_hand(5, seed=1))
+    with pytest.raises(ValueError):
+        kmers.KmerIndex(path, k=12, readonly=True)
@@ -0,0 +1,235 @@
+"""
+otus.py
+
+I am an approximate (OTU-style) sequence clustering engine.
+Exact DnaHash grouping splinters one true variant across many signatures (one per sequencing error);
+I gather the distinct sequences of a group, or of a whole project, into clusters around centroids:
+
+* sequences are visited in order of decreasing abundance, so the common (true) variants become centroids first,
+* each sequence is compared only with the centroids that share enough k-mers with it to reach the threshold
+  (the prefilter), most shared first; every such centroid is checked unless a candidates cap is given,
+* a candidate is accepted when its edit distance (computed only when the lengths are within the band
+  allowed by the identity threshold) gives an identity of at least the threshold,
+* a sequence that matches no centroid founds a new cluster.
+
+Batches of sequences are matched against the centroids found so far in worker processes, each of which
+keeps its own copy of the centroids and is sent only those found since its previous task;
+the sequences that match nothing are then settled among themselves, in order, in this process.
+"""
+import collections
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from toad.lib import kmers
+
+
+IDENTITY = 0.97  # -- default clustering threshold
+KMER_SIZE = 8  # -- prefilter word size
+CANDIDATES = None  # -- centroids (best by shared k-mers first) checked per sequence; None checks all that may match
+BATCH = 4096  # -- sequences matched against the centroids per batch
+
+
+def edit_distance(a, b):
+    """
+    I answer the (global, unit cost) edit distance between the strings a and b.
+    Bit-parallel (Myers / Hyyro): one pass over b, with a column of len(a) cells held in a python int.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(a)
+    if m == 0:
+        return len(b)
+    peq = collections.defaultdict(int)
+    for i, c in enumerate(a):
+        peq[c] |= 1 << i
+    mask = (1 << m) - 1
+    top = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for c in b:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & top:
+            score += 1
+        elif mh & top:
+            score -= 1
+        ph = (ph << 1) | 1  # -- global alignment: the top row counts up, D[0][j] = j
+        mh = mh << 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    # -- the loop walked len(b) columns from D[m][0] = m; score is now D[m][len(b)]
+    return score
+
+
+def identity(a, b):
+    """
+    I answer 1 - edit distance / length of the longer sequence.
+    """
+    longest = max(len(a), len(b))
+    return (1.0 - edit_distance(a, b) / longest) if longest else 1.0
+
+
+def _words(seq, k):
+    return np.unique(kmers.kmers_of(np.frombuffer(seq.encode('ascii'), dtype=np.uint8), k)[1])
+
+
+class CentroidIndex:
+    """
+    I am an append-only list of centroid sequences, with a k-mer -> centroids posting list for the prefilter.
+    """
+    def __init__(self, k=KMER_SIZE):
+        self.k = k
+        self.seqs = []
+        self.lengths = np.empty(0, dtype=np.int64)
+        self._postings = collections.defaultdict(list)
+        self._frozen = {}
+
+    def __len__(self):
+        return len(self.seqs)
+
+    def append(self, seq):
+        n = len(self.seqs)
+        self.seqs.append(seq)
+        if n == len(self.lengths):
+            self.lengths = np.resize(self.lengths, max(16, 2 * n))
+        self.lengths[n] = len(seq)
+        for word in _words(seq, self.k).tolist():
+            self._postings[word].append(n)
+            self._frozen.pop(word, None)
+        return n
+
+    def _posting(self, word):
+        if word not in self._frozen:
+            self._frozen[word] = np.asarray(self._postings[word], dtype=np.int64)
+        return self._frozen[word]
+
+    def best(self, seq, threshold, candidates=CANDIDATES):
+        """
+        I answer the index of the first centroid (best by shared k-mers) within threshold identity of seq, or None.
+        Every centroid sharing enough k-mers to reach the threshold is checked, unless candidates caps their number:
+        a cap is faster, but a sequence may then found a new cluster although a qualifying centroid exists.
+        """
+        if not self.seqs:
+            return None
+        words = _words(seq, self.k).tolist()
+        known = [word for word in words if word in self._postings]
+        if not known:
+            return None
+        shared = np.bincount(np.concatenate([self._posting(word) for word in known]), minlength=len(self.seqs))
+
+        # -- the edits a match may have scale with the longer of the two sequences (as identity does),
+        # -- and every edit destroys at most k words, which bounds the words a true match must share
+        lengths = self.lengths[:len(self.seqs)]
+        allowed = np.floor((1.0 - threshold) * np.maximum(lengths, len(seq))).astype(np.int64)
+        floor = np.maximum(1, len(words) - self.k * allowed)
+        top = np.argsort(-shared, kind='stable')
+        top = top[shared[top] >= floor[top]][:candidates]
+        for c in top.tolist():
+            centroid = self.seqs[c]
+            # -- the band: a length difference larger than the allowed edits can't reach the threshold
+            if abs(len(centroid) - len(seq)) > allowed[c]:
+                continue
+            if identity(centroid, seq) >= threshold:
+                return c
+        return None
+
+
+# -------------------------------------------------------------
+# -- Worker processes keep their own CentroidIndex, and are    |
+# -- only sent the centroids added since their previous task. |
+# -------------------------------------------------------------
+_worker_index = None
+
+
+def _match_chunk(fresh, known, k, seqs, threshold, candidates):
+    """
+    I run in a worker process: I add fresh (the centroids after the first known ones) to my index, then match seqs.
+    """
+    global _worker_index
+    if known == 0:
+        _worker_index = CentroidIndex(k)
+    if len(_worker_index) != known:
+        raise ValueError("worker holds {} centroids, not {}".format(len(_worker_index), known))
+    for seq in fresh:
+        _worker_index.append(seq)
+    return [_worker_index.best(seq, threshold, candidates) for seq in seqs]
+
+
+def cluster(hand, threshold=IDENTITY, abundance=None, k=KMER_SIZE, batch=BATCH, workers=1, candidates=CANDIDATES):
+    """
+    Given a collection of Nucleotides (e.g. group.hand()), I answer {centroid signature: [member signatures, ...]},
+    clustered at the given identity threshold.
+    Every centroid is the first of its own members.
+    abundance maps signature -> count (e.g. number of runs); sequences are visited most abundant first,
+    then longest first.
+    """
+    if not 0.0 < threshold <= 1.0:
+        raise ValueError("identity threshold must be in (0, 1], not {}".format(threshold))
+    abundance = abundance or {}
+    hand = sorted(set(hand), key=lambda n: (-abundance.get(n.signature, 1), -n.length, str(n.signature)))
+
+    index = CentroidIndex(k)
+    centroids = []
+    members = {}
+    # -- one single process pool per worker, so that each job reaches the worker whose centroids I keep track of
+    pools = []
+    if workers > 1:
+        pools = [ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context()) for w in range(workers)]
+    sent = [0] * len(pools)  # -- centroids each worker holds
+    try:
+        for i in range(0, len(hand), batch):
+            chunk = hand[i:i + batch]
+            seqs = [n.sequence for n in chunk]
+
+            # -- match the batch against the centroids found in earlier batches
+            if not pools:
+                matches = [index.best(seq, threshold, candidates) for seq in seqs]
+            else:
+                step = math.ceil(len(seqs) / workers)
+                jobs = []
+                for w, j in enumerate(range(0, len(seqs), step)):
+                    jobs.append(pools[w].submit(_match_chunk, index.seqs[sent[w]:], sent[w], k, seqs[j:j + step],
+                                                threshold, candidates))
+                    sent[w] = len(index)
+                matches = [c for job in jobs for c in job.result()]
+
+            # -- then settle the unmatched ones, in order, against the centroids they found among themselves
+            known = len(index)
+            for nucls, seq, c in zip(chunk, seqs, matches):
+                if c is None and len(index) > known:
+                    c = index.best(seq, threshold, candidates)
+                if c is None:
+                    c = index.append(seq)
+                    centroids.append(nucls.signature)
+                    members[nucls.signature] = []
+                members[centroids[c]].append(nucls.signature)
+    finally:
+        for pool in pools:
+            pool.shutdown()
+    return members
+
+
+def abundances(groups):
+    """
+    I answer {signature: number of runs} over the given groups.
+    """
+    counts = collections.Counter()
+    for group in groups:
+        for sig in group.SignatureAndGroupes:
+            counts[sig] += len(group._SignatureAndGroupes[sig])
+    return counts
+
+
+def cluster_groups(groups, **kwargs):
+    """
+    I cluster the distinct sequences of all the given groups (a project), weighting them by run counts.
+    """
+    hand = set()
+    for group in groups:
+        hand.update(group.hand())
+    return cluster(hand, abundance=abundances(groups), **kwargs)
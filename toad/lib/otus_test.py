@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from toad.lib import common as cx
+from toad.lib import otus
+
+
+def _distance(a, b):
+    """
+    I answer the edit distance of a and b, by the textbook dynamic program.
+    """
+    row = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, y in enumerate(b, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (x != y))
+    return row[-1]
+
+
+def _mutated(rng, seq, edits):
+    seq = list(seq)
+    for _ in range(edits):
+        at = rng.randrange(len(seq) + 1)
+        kind = rng.choice('sid') if seq else 'i'
+        if kind == 's' and at < len(seq):
+            seq[at] = rng.choice('ACGT')
+        elif kind == 'd' and at < len(seq):
+            del seq[at]
+        else:
+            seq.insert(at, rng.choice('ACGT'))
+    return ''.join(seq)
+
+
+def test_edit_distance_matches_the_dynamic_program():
+    rng = random.Random(0)
+    pairs = [('', ''), ('', 'ACGT'), ('ACGT', ''), ('A', 'A'), ('GATTACA', 'TACAGAT'), ('ACGT', 'acgt')]
+    for _ in range(300):
+        a = ''.join([rng.choice('ACGT') for _ in range(rng.randrange(0, 150))])
+        pairs.append((a, _mutated(rng, a, rng.randrange(0, 20))))
+        pairs.append((a, ''.join([rng.choice('ACGTN') for _ in range(rng.randrange(0, 150))])))
+    for a, b in pairs:
+        assert otus.edit_distance(a, b) == otus.edit_distance(b, a) == _distance(a, b)
+    assert otus.identity('', '') == 1.0
+    assert otus.identity('ACGTACGTAC', 'ACGTACGTAA') == pytest.approx(0.9)
+
+
+def test_a_longer_centroid_gets_its_edits():
+    rng = random.Random(1)
+    seq = ''.join([rng.choice('ACGT') for _ in range(165)])
+    # -- 5 inserts, 20 bases apart: identity 1 - 5/170 passes 0.97, but 5 edits exceed the 4 that 0.97 of 165 allows
+    centroid = seq
+    for at in (100, 80, 60, 40, 20):  # -- right to left, so that the earlier positions stay put
+        centroid = centroid[:at] + ('T' if centroid[at - 1] != 'T' else 'G') + centroid[at:]
+    assert len(centroid) == 170 and otus.edit_distance(seq, centroid) == 5
+    assert otus.identity(seq, centroid) >= 0.97
+
+    index = otus.CentroidIndex()
+    index.append(centroid)
+    assert index.best(seq, 0.97) == 0
+
+
+def test_cluster_gathers_variants():
+    rng = random.Random(2)
+    bases = [''.join([rng.choice('ACGT') for _ in range(200)]) for _ in range(5)]
+    hand = [cx.Nucleotides(seq) for seq in bases]
+    variants = dict([(str(nucls.signature), i) for i, nucls in enumerate(hand)])
+    for i, seq in enumerate(bases):
+        for _ in range(10):
+            nucls = cx.Nucleotides(_mutated(rng, seq, rng.randrange(1, 4)))
+            variants.setdefault(str(nucls.signature), i)
+            hand.append(nucls)
+    abundance = dict([(nucls.signature, 100) for nucls in hand[:5]])
+
+    found = otus.cluster(hand, threshold=0.97, abundance=abundance)
+    assert sorted(map(str, found.keys())) == sorted([str(nucls.signature) for nucls in hand[:5]])
+    for centroid, members in found.items():
+        assert set([variants[str(sig)] for sig in members]) == {variants[str(centroid)]}
+    assert sum(map(len, found.values())) == len(set(hand))